@@ -0,0 +1,179 @@
+import os
+import re
+import asyncio
+import hashlib
+import logging
+from functools import lru_cache
+from typing import List
+from llm import llm
+from prompts import PROMPT_VERSION, build_chunk_prompt
+from summary_cache import normalize_text, summary_cache, summary_key
+
+TIKTOKEN_ENCODING = os.getenv("TIKTOKEN_ENCODING", "cl100k_base")
+CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "1500"))
+# 片段不小于该 token 数才允许在段落处切分，避免碎片
+CHUNK_MIN_TOKENS = int(os.getenv("SUMMARY_CHUNK_MIN_TOKENS", str(CHUNK_TOKENS // 4)))
+# 只用于单个段落超过 CHUNK_TOKENS 时的段内切分
+CHUNK_OVERLAP = int(os.getenv("SUMMARY_CHUNK_OVERLAP", "100"))
+# 超过该 token 数的文本走分段摘要
+LONG_TEXT_TOKENS = int(os.getenv("SUMMARY_LONG_TEXT_TOKENS", "3000"))
+CHUNK_CONCURRENCY = int(os.getenv("SUMMARY_CHUNK_CONCURRENCY", "4"))
+# 各段要点合起来仍然过长时，继续分段压缩的最大轮数
+MAX_COLLAPSE_ROUNDS = 3
+
+logger = logging.getLogger(__name__)
+
+# 超长段落在句子边界切分
+SEPARATORS = ["\n\n", "\n", "。", "！", "？", "；", "，", " ", ""]
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# Markdown 标题，或“第三章”“第 2 节”一类的中文标题
+_HEADING = re.compile(r"\s*(#{1,6}\s|第\s*[一二三四五六七八九十百千零〇\d]+\s*[章节部篇回])")
+# 片段摘要与整篇摘要使用不同的缓存键空间
+CHUNK_PROMPT_VERSION = f"{PROMPT_VERSION}-chunk"
+
+chunked_texts = 0
+chunk_calls = 0
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """tiktoken 编码表首次使用时需下载；无法加载时退回按字符计数（中文约一字一 token）"""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(TIKTOKEN_ENCODING)
+    except Exception as e:
+        logger.warning(f"tiktoken encoding {TIKTOKEN_ENCODING} unavailable, counting characters instead: {e}")
+        return None
+
+
+@lru_cache(maxsize=1)
+def _splitter():
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    options = dict(chunk_size=CHUNK_TOKENS, chunk_overlap=CHUNK_OVERLAP, separators=SEPARATORS, keep_separator="end")
+    if _encoding() is None:
+        return RecursiveCharacterTextSplitter(length_function=len, **options)
+    return RecursiveCharacterTextSplitter.from_tiktoken_encoder(encoding_name=TIKTOKEN_ENCODING, **options)
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return len(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+async def is_long(text: str) -> bool:
+    # 长文编码耗时较长，放到线程中避免阻塞事件循环
+    return await asyncio.to_thread(count_tokens, text) > LONG_TEXT_TOKENS
+
+
+def _blocks(text: str) -> List[str]:
+    """按空行切成段落，标题行单独起一段"""
+    blocks = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        lines = []
+        for line in paragraph.split("\n"):
+            if lines and _HEADING.match(line):
+                blocks.append("\n".join(lines))
+                lines = []
+            lines.append(line)
+        blocks.append("\n".join(lines))
+    return [block.strip() for block in blocks if block.strip()]
+
+
+def _is_anchor(block: str, tokens: int) -> bool:
+    """是否在该段之后切分只取决于段落本身的内容；命中概率与段落长度成正比，平均约 CHUNK_TOKENS / 2 切一次"""
+    digest = hashlib.blake2b(normalize_text(block).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64 < tokens * 2 / CHUNK_TOKENS
+
+
+def split_text(text: str) -> List[str]:
+    """内容定义的分段：切点落在标题前或由段落内容选中的段落后，不随前文长度平移。
+
+    修改某一节只会改变它所在的片段，其余片段文本保持不变，片段摘要缓存可以继续命中。
+    """
+    chunks, current, size = [], [], 0
+
+    def flush():
+        nonlocal size
+        if current:
+            chunks.append("\n\n".join(current))
+            current.clear()
+        size = 0
+
+    for block in _blocks(text):
+        tokens = count_tokens(block)
+        if tokens > CHUNK_TOKENS:
+            # 单个段落本身过长，只在段内按句子切分
+            flush()
+            chunks.extend(_splitter().split_text(block))
+            continue
+        if current and (size + tokens > CHUNK_TOKENS or (size >= CHUNK_MIN_TOKENS and _HEADING.match(block))):
+            flush()
+        current.append(block)
+        size += tokens
+        if size >= CHUNK_MIN_TOKENS and _is_anchor(block, tokens):
+            flush()
+    flush()
+    return chunks
+
+
+async def _summarize_chunk(chunk: str) -> dict:
+    global chunk_calls
+    chunk_calls += 1
+    content = await llm.complete(build_chunk_prompt(chunk))
+    return {"summary": content.strip()}
+
+
+async def summarize_chunks(text: str) -> List[str]:
+    """map 阶段：分段并发摘要，按片段内容缓存，修改一节只需重算该节"""
+    chunks = await asyncio.to_thread(split_text, text)
+    semaphore = asyncio.Semaphore(CHUNK_CONCURRENCY)
+
+    async def compute(chunk):
+        async with semaphore:
+            return await _summarize_chunk(chunk)
+
+    async def summarize(chunk):
+        key = summary_key(chunk, prompt_version=CHUNK_PROMPT_VERSION)
+        result = await summary_cache.get_or_compute(key, lambda: compute(chunk))
+        return result["summary"]
+
+    return list(await asyncio.gather(*(summarize(chunk) for chunk in chunks)))
+
+
+async def map_chunks(text: str) -> List[str]:
+    """返回用于 reduce 的各段要点，必要时多轮压缩直到能放进一次请求"""
+    global chunked_texts
+    chunked_texts += 1
+    partials = await summarize_chunks(text)
+    for _ in range(MAX_COLLAPSE_ROUNDS):
+        if await asyncio.to_thread(count_tokens, "\n".join(partials)) <= LONG_TEXT_TOKENS:
+            return partials
+        partials = await summarize_chunks("\n\n".join(partials))
+    return await asyncio.to_thread(_truncate, partials)
+
+
+def _truncate(partials: List[str]) -> List[str]:
+    """压缩轮数用尽仍然过长时，只保留放得下的前若干段要点"""
+    kept, total = [], 0
+    for partial in partials:
+        tokens = count_tokens(partial) + 1
+        if total + tokens > LONG_TEXT_TOKENS:
+            break
+        kept.append(partial)
+        total += tokens
+    if len(kept) < len(partials):
+        logger.warning(f"Chunk summaries still exceed {LONG_TEXT_TOKENS} tokens, kept {len(kept)}/{len(partials)}")
+    return kept
+
+
+def stats() -> dict:
+    return {
+        "chunk_tokens": CHUNK_TOKENS,
+        "long_text_tokens": LONG_TEXT_TOKENS,
+        "chunked_texts": chunked_texts,
+        "chunk_calls": chunk_calls,
+    }
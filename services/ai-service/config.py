@@ -1,2 +1,18 @@
+import os
 
-OPENAI_BASE_URL="https://dashscope.aliyuncs.com/compatible-mode/v1"
\ No newline at end of file
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")
+
+# LLM 调用参数
+LLM_MODEL = os.getenv("LLM_MODEL", "qwen-plus")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+
+# 模型后端：openai（默认，兼容 OpenAI 接口的服务）或 fake（进程内模拟，用于压测）
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+
+# 文章向量模型（兼容 OpenAI 的 embeddings 接口）与输出维度
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-v3")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "1024"))
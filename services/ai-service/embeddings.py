@@ -0,0 +1,210 @@
+import os
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import EMBEDDING_MODEL, EMBEDDING_DIM
+from database.database import SessionLocal
+from database.models import Article as DBArticle
+from database.models import ArticleEmbedding as DBArticleEmbedding
+from llm import llm
+from summaries import article_text, content_hash
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_JOB_CONCURRENCY = int(os.getenv("EMBEDDING_JOB_CONCURRENCY", "4"))
+# 超出模型输入上限的部分截断，标题与开头最能代表文章主题
+EMBEDDING_MAX_CHARS = int(os.getenv("EMBEDDING_MAX_CHARS", "4000"))
+# 多实例部署时，从数据库同步其他实例写入的向量
+EMBEDDING_SYNC_INTERVAL = float(os.getenv("EMBEDDING_SYNC_INTERVAL", "60"))
+RELATED_DEFAULT_K = 5
+RELATED_MAX_K = 50
+
+
+class EmbeddingIndex:
+    """进程内向量矩阵：每行一篇文章的单位向量（float32），相似度为一次矩阵乘法"""
+
+    def __init__(self, dim: int = EMBEDDING_DIM, model: str = EMBEDDING_MODEL):
+        self.dim = dim
+        self.model = model
+        # 按容量预分配，写入时倍增扩容；删除时用最后一行填补空位
+        self.matrix = np.zeros((0, dim), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.positions: Dict[int, int] = {}
+        self.size = 0
+        self.synced_at = None
+        self._task = None
+        self.queries = 0
+
+    def _grow(self):
+        capacity = max(1024, len(self.matrix) * 2)
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[:self.size] = self.matrix[:self.size]
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:self.size] = self.ids[:self.size]
+        self.matrix, self.ids = matrix, ids
+
+    def upsert(self, article_id: int, vector: np.ndarray):
+        position = self.positions.get(article_id)
+        if position is None:
+            if self.size == len(self.matrix):
+                self._grow()
+            position = self.size
+            self.size += 1
+            self.positions[article_id] = position
+            self.ids[position] = article_id
+        self.matrix[position] = vector
+
+    def remove(self, article_id: int):
+        position = self.positions.pop(article_id, None)
+        if position is None:
+            return
+        last = self.size - 1
+        if position != last:
+            moved = int(self.ids[last])
+            self.matrix[position] = self.matrix[last]
+            self.ids[position] = moved
+            self.positions[moved] = position
+        self.size = last
+
+    def contains(self, article_id: int) -> bool:
+        return article_id in self.positions
+
+    def related(self, article_id: int, k: int) -> List[Tuple[int, float]]:
+        """余弦相似度最高的 k 篇（不含自身），按相似度降序"""
+        position = self.positions.get(article_id)
+        if position is None or self.size < 2:
+            return []
+        self.queries += 1
+        scores = self.matrix[:self.size] @ self.matrix[position]
+        scores[position] = -np.inf
+        k = min(k, self.size - 1)
+        # argpartition 为 O(n)，只对前 k 个排序
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[i]), float(scores[i])) for i in top]
+
+    def _load_row(self, row):
+        vector = np.frombuffer(row.vector, dtype=np.float32)
+        if vector.shape != (self.dim,):
+            return
+        self.upsert(row.article_id, vector)
+
+    async def sync(self):
+        """增量加载 updated_at 不早于上次同步点的向量，并移除已删除的文章"""
+        async with SessionLocal() as db:
+            query = select(DBArticleEmbedding.article_id, DBArticleEmbedding.vector, DBArticleEmbedding.updated_at).where(
+                DBArticleEmbedding.model == self.model, DBArticleEmbedding.dim == self.dim
+            )
+            # DATETIME 只精确到秒，用 >= 并重放同一秒内的行，upsert 是幂等的
+            if self.synced_at is not None:
+                query = query.where(DBArticleEmbedding.updated_at >= self.synced_at)
+            rows = (await db.execute(query)).all()
+            live = None
+            if self.synced_at is not None:
+                result = await db.execute(
+                    select(DBArticleEmbedding.article_id).where(
+                        DBArticleEmbedding.model == self.model, DBArticleEmbedding.dim == self.dim
+                    )
+                )
+                live = set(result.scalars().all())
+
+        for row in rows:
+            self._load_row(row)
+            if self.synced_at is None or row.updated_at > self.synced_at:
+                self.synced_at = row.updated_at
+        if live is not None:
+            for article_id in set(self.positions) - live:
+                self.remove(article_id)
+
+    async def _sync_loop(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Embedding sync failed: {e}")
+            await asyncio.sleep(EMBEDDING_SYNC_INTERVAL)
+
+    async def start(self):
+        await self.sync()
+        logger.info(f"Loaded {self.size} article embeddings")
+        if EMBEDDING_SYNC_INTERVAL > 0:
+            self._task = asyncio.create_task(self._sync_loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "dim": self.dim,
+            "articles": self.size,
+            "capacity": len(self.matrix),
+            "memory_mb": round(self.matrix.nbytes / 1024 / 1024, 2),
+            "queries": self.queries,
+        }
+
+
+embedding_index = EmbeddingIndex()
+
+
+def normalize(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+async def load_embedding(db: AsyncSession, article_id: int) -> Optional[DBArticleEmbedding]:
+    result = await db.execute(select(DBArticleEmbedding).where(DBArticleEmbedding.article_id == article_id))
+    return result.scalars().first()
+
+
+async def missing_embedding_ids(db: AsyncSession) -> List[int]:
+    """没有向量、或向量来自其他模型/维度的文章"""
+    result = await db.execute(
+        select(DBArticle.id)
+        .outerjoin(DBArticleEmbedding, DBArticleEmbedding.article_id == DBArticle.id)
+        .where(
+            (DBArticleEmbedding.article_id.is_(None))
+            | (DBArticleEmbedding.model != EMBEDDING_MODEL)
+            | (DBArticleEmbedding.dim != EMBEDDING_DIM)
+        )
+    )
+    return list(result.scalars().all())
+
+
+async def embed_article(article_id: int):
+    """后台任务：正文未变化时跳过，否则计算向量写入 article_embeddings 并更新内存矩阵"""
+    async with SessionLocal() as db:
+        result = await db.execute(select(DBArticle.title, DBArticle.content).where(DBArticle.id == article_id))
+        article = result.first()
+        if article is None:
+            # 文章已删除，向量随外键级联删除
+            embedding_index.remove(article_id)
+            return
+        text = article_text(article.title, article.content)
+        text_hash = content_hash(text)
+        existing = await load_embedding(db, article_id)
+        if (existing is not None and existing.content_hash == text_hash
+                and existing.model == EMBEDDING_MODEL and existing.dim == EMBEDDING_DIM):
+            embedding_index.upsert(article_id, np.frombuffer(existing.vector, dtype=np.float32))
+            return
+
+    vector = normalize((await llm.embed([text[:EMBEDDING_MAX_CHARS]]))[0])
+    if vector.shape != (EMBEDDING_DIM,):
+        raise ValueError(f"embedding has {vector.shape[0]} dimensions, expected {EMBEDDING_DIM}")
+
+    async with SessionLocal() as db:
+        await db.merge(DBArticleEmbedding(
+            article_id=article_id,
+            content_hash=text_hash,
+            model=EMBEDDING_MODEL,
+            dim=EMBEDDING_DIM,
+            vector=vector.tobytes(),
+        ))
+        await db.commit()
+    embedding_index.upsert(article_id, vector)
@@ -0,0 +1,218 @@
+"""模拟模型后端，用于离线压测。
+
+进程内使用：LLM_BACKEND=fake uvicorn main:app --port 8004
+独立 HTTP 服务（兼容 OpenAI 接口，走真实 SDK 与网络路径）：
+    python fake_llm.py --port 9000
+    OPENAI_BASE_URL=http://localhost:9000/v1 uvicorn main:app --port 8004
+"""
+import os
+import json
+import time
+import uuid
+import zlib
+import random
+import asyncio
+import argparse
+import unicodedata
+from typing import AsyncIterator, List
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from llm_backends import LLMBackend, TransientLLMError
+
+# 首个分片前的延迟分布：constant / uniform / normal / lognormal
+FAKE_LLM_LATENCY = os.getenv("FAKE_LLM_LATENCY", "lognormal")
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))
+# uniform 为上下浮动比例，normal 为标准差占均值的比例，lognormal 为 sigma
+FAKE_LLM_LATENCY_SPREAD = float(os.getenv("FAKE_LLM_LATENCY_SPREAD", "0.5"))
+# 流式输出时相邻分片的间隔
+FAKE_LLM_TOKEN_MS = float(os.getenv("FAKE_LLM_TOKEN_MS", "20"))
+# 错误注入：可重试错误、不可重试错误、挂起不返回（触发超时）的比例
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_FATAL_RATE = float(os.getenv("FAKE_LLM_FATAL_RATE", "0"))
+FAKE_LLM_HANG_RATE = float(os.getenv("FAKE_LLM_HANG_RATE", "0"))
+FAKE_LLM_SEED = os.getenv("FAKE_LLM_SEED")
+
+# 每个流式分片的字符数
+PIECE_SIZE = 4
+
+
+class FakeLLMError(Exception):
+    """注入的不可重试错误"""
+
+
+class FakeBackend(LLMBackend):
+    name = "fake"
+
+    def __init__(self, latency: str = FAKE_LLM_LATENCY, latency_ms: float = FAKE_LLM_LATENCY_MS,
+                 spread: float = FAKE_LLM_LATENCY_SPREAD, token_ms: float = FAKE_LLM_TOKEN_MS,
+                 error_rate: float = FAKE_LLM_ERROR_RATE, fatal_rate: float = FAKE_LLM_FATAL_RATE,
+                 hang_rate: float = FAKE_LLM_HANG_RATE, seed=FAKE_LLM_SEED):
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.spread = spread
+        self.token_ms = token_ms
+        self.error_rate = error_rate
+        self.fatal_rate = fatal_rate
+        self.hang_rate = hang_rate
+        self._random = random.Random(seed)
+
+    def sample_latency(self) -> float:
+        """按配置的分布采样首个分片前的延迟（秒）"""
+        mean = self.latency_ms / 1000
+        if self.latency == "constant":
+            value = mean
+        elif self.latency == "uniform":
+            value = self._random.uniform(mean * (1 - self.spread), mean * (1 + self.spread))
+        elif self.latency == "normal":
+            value = self._random.gauss(mean, mean * self.spread)
+        elif self.latency == "lognormal":
+            # latency_ms 为中位数，长尾由 sigma 控制
+            value = self._random.lognormvariate(0, self.spread) * mean
+        else:
+            raise ValueError(f"Unknown latency distribution: {self.latency}")
+        return max(value, 0.0)
+
+    async def _inject(self, timeout: float):
+        roll = self._random.random()
+        if roll < self.hang_rate:
+            await asyncio.sleep(timeout * 2)
+        elif roll < self.hang_rate + self.error_rate:
+            raise TransientLLMError("injected transient error")
+        elif roll < self.hang_rate + self.error_rate + self.fatal_rate:
+            raise FakeLLMError("injected fatal error")
+
+    @staticmethod
+    def reply(prompt: str) -> str:
+        return (
+            f"【总结】：这是模拟生成的摘要，原始提示词共 {len(prompt)} 字。\n"
+            "【情感】：中性\n"
+            "【关键词】：模拟，压测，性能"
+        )
+
+    @staticmethod
+    def pieces(content: str) -> List[str]:
+        return [content[i:i + PIECE_SIZE] for i in range(0, len(content), PIECE_SIZE)]
+
+    async def complete(self, model: str, prompt: str, timeout: float) -> str:
+        await self._inject(timeout)
+        content = self.reply(prompt)
+        await asyncio.sleep(self.sample_latency() + self.token_ms / 1000 * len(self.pieces(content)))
+        return content
+
+    async def stream(self, model: str, prompt: str, timeout: float) -> AsyncIterator[str]:
+        await self._inject(timeout)
+        await asyncio.sleep(self.sample_latency())
+        return self._emit(self.pieces(self.reply(prompt)))
+
+    @staticmethod
+    def vector(text: str, dim: int) -> List[float]:
+        """特征哈希：字符二元组哈希到固定维度，相同文本得到相同向量，用词相近的文本余弦相似度更高"""
+        text = unicodedata.normalize("NFKC", text).lower()
+        vector = np.zeros(dim, dtype=np.float32)
+        for i in range(len(text) - 1):
+            gram = text[i:i + 2]
+            if gram.isspace():
+                continue
+            h = zlib.crc32(gram.encode("utf-8"))
+            vector[h % dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    async def embed(self, model: str, texts: List[str], dim: int, timeout: float) -> List[List[float]]:
+        await self._inject(timeout)
+        await asyncio.sleep(self.sample_latency())
+        return [self.vector(text, dim) for text in texts]
+
+    async def _emit(self, pieces: List[str]):
+        for i, piece in enumerate(pieces):
+            if i:
+                await asyncio.sleep(self.token_ms / 1000)
+            yield piece
+
+
+# 兼容 OpenAI 的 HTTP 服务，注入的错误映射为对应的状态码
+app = FastAPI(title="Fake LLM")
+backend = FakeBackend()
+
+
+def _completion_id() -> str:
+    return f"chatcmpl-{uuid.uuid4().hex}"
+
+
+def _error(status_code: int, message: str) -> JSONResponse:
+    return JSONResponse(status_code=status_code, content={"error": {"message": message, "type": "fake_error"}})
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "fake")
+    prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+    # HTTP 模式下不知道调用方的超时，挂起时按该值的两倍等待
+    timeout = 300.0
+
+    try:
+        if not body.get("stream"):
+            content = await backend.complete(model, prompt, timeout)
+            return {
+                "id": _completion_id(),
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt), "completion_tokens": len(content), "total_tokens": len(prompt) + len(content)},
+            }
+        pieces = await backend.stream(model, prompt, timeout)
+    except TransientLLMError as e:
+        return _error(503, str(e))
+    except FakeLLMError as e:
+        return _error(400, str(e))
+
+    completion_id = _completion_id()
+
+    async def events():
+        async for piece in pieces:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    model = body.get("model", "fake")
+    texts = body.get("input", [])
+    if isinstance(texts, str):
+        texts = [texts]
+    try:
+        vectors = await backend.embed(model, texts, int(body.get("dimensions", 1024)), 300.0)
+    except TransientLLMError as e:
+        return _error(503, str(e))
+    except FakeLLMError as e:
+        return _error(400, str(e))
+    tokens = sum(len(text) for text in texts)
+    return {
+        "object": "list",
+        "data": [{"object": "embedding", "index": i, "embedding": vector} for i, vector in enumerate(vectors)],
+        "model": model,
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible fake LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
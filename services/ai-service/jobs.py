@@ -0,0 +1,188 @@
+import os
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Awaitable, Callable, Iterable, Optional
+from sqlalchemy import and_, delete, func, or_, update
+from sqlalchemy.future import select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.database import SessionLocal
+from database.models import AIJob
+
+logger = logging.getLogger(__name__)
+
+# 任务类型，与 article-service 入队时约定
+SUMMARY = "summary"
+EMBEDDING = "embedding"
+
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "5"))
+# 认领后超过该时长仍未完成，视为工作进程已退出，允许重新认领
+JOB_LEASE = float(os.getenv("JOB_LEASE", "300"))
+# 重试耗尽的任务冷却该时长后，再次请求或启动补齐时重新入队
+JOB_FAILED_COOLDOWN = float(os.getenv("JOB_FAILED_COOLDOWN", "600"))
+
+
+def _insert_missing(db: AsyncSession, rows):
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite_insert(AIJob).values(rows).on_conflict_do_nothing(index_elements=[AIJob.kind, AIJob.ref_id])
+    stmt = mysql_insert(AIJob).values(rows)
+    return stmt.on_duplicate_key_update(kind=stmt.inserted.kind)
+
+
+async def enqueue_missing(db: AsyncSession, kind: str, ref_ids: Iterable[int]):
+    """只为尚未排队的对象入队，已有的任务（包括正在重试的）保持不变；冷却期已过的失败任务重新入队"""
+    ref_ids = list(ref_ids)
+    rows = [{"kind": kind, "ref_id": ref_id, "status": "pending", "version": 1, "attempts": 0} for ref_id in ref_ids]
+    if not rows:
+        return
+    await db.execute(_insert_missing(db, rows))
+    # 失败时 run_at 被设为冷却结束时间
+    await db.execute(
+        update(AIJob)
+        .where(AIJob.kind == kind, AIJob.ref_id.in_(ref_ids), AIJob.status == "failed", AIJob.run_at <= func.now())
+        .values(status="pending", attempts=0, version=AIJob.version + 1, run_at=func.now())
+    )
+
+
+async def failed_error(db: AsyncSession, kind: str, ref_id: int) -> Optional[str]:
+    """仍在冷却期内的失败任务返回最后一次错误，否则返回 None"""
+    result = await db.execute(
+        select(AIJob.last_error).where(AIJob.kind == kind, AIJob.ref_id == ref_id, AIJob.status == "failed")
+    )
+    row = result.first()
+    return None if row is None else (row.last_error or "failed")
+
+
+class JobWorker:
+    """轮询 ai_jobs 中某一类任务：SKIP LOCKED 认领、限制并发、失败按指数退避重试"""
+
+    def __init__(self, kind: str, handler: Callable[[int], Awaitable[None]], concurrency: int,
+                 max_attempts: int = JOB_MAX_ATTEMPTS, retry_backoff: float = JOB_RETRY_BACKOFF,
+                 poll_interval: float = JOB_POLL_INTERVAL, lease: float = JOB_LEASE):
+        self.kind = kind
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self._task = None
+        self._running = set()
+        self._wakeup = asyncio.Event()
+        self.claimed = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        # 未完成的任务在租约到期后会被重新认领
+        for task in list(self._running):
+            task.cancel()
+
+    async def _run(self):
+        while True:
+            free = self.concurrency - len(self._running)
+            claimed = []
+            if free > 0:
+                try:
+                    claimed = await self._claim(free)
+                except Exception as e:
+                    logger.error(f"Claiming {self.kind} jobs failed: {e}")
+            for job in claimed:
+                task = asyncio.create_task(self._execute(job))
+                self._running.add(task)
+                task.add_done_callback(self._done)
+            # 认领满额说明可能还有积压，立即再取；否则等待轮询间隔或有空闲槽位
+            if claimed and len(claimed) == free:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _done(self, task):
+        self._running.discard(task)
+        self._wakeup.set()
+
+    async def _claim(self, limit: int):
+        async with SessionLocal() as db:
+            now = (await db.execute(select(func.now()))).scalar()
+            expired = now - timedelta(seconds=self.lease)
+            result = await db.execute(
+                select(AIJob.id, AIJob.ref_id, AIJob.version, AIJob.attempts)
+                .where(
+                    AIJob.kind == self.kind,
+                    or_(
+                        and_(AIJob.status == "pending", AIJob.run_at <= now),
+                        and_(AIJob.status == "running", AIJob.locked_at < expired),
+                    ),
+                )
+                .order_by(AIJob.run_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            jobs = result.all()
+            if jobs:
+                await db.execute(
+                    update(AIJob)
+                    .where(AIJob.id.in_([job.id for job in jobs]))
+                    .values(status="running", locked_at=now, attempts=AIJob.attempts + 1)
+                )
+            await db.commit()
+        self.claimed += len(jobs)
+        return jobs
+
+    async def _execute(self, job):
+        try:
+            await self.handler(job.ref_id)
+        except Exception as e:
+            logger.warning(f"{self.kind} job for {job.ref_id} failed (attempt {job.attempts + 1}): {e}")
+            await self._fail(job, e)
+        else:
+            await self._finish(job)
+
+    def _current(self, job):
+        # 处理期间重新入队的任务版本已变，不能覆盖
+        return and_(AIJob.id == job.id, AIJob.version == job.version, AIJob.status == "running")
+
+    async def _finish(self, job):
+        self.succeeded += 1
+        async with SessionLocal() as db:
+            await db.execute(delete(AIJob).where(self._current(job)))
+            await db.commit()
+
+    async def _fail(self, job, error: Exception):
+        attempts = job.attempts + 1
+        async with SessionLocal() as db:
+            now = (await db.execute(select(func.now()))).scalar()
+            if attempts >= self.max_attempts:
+                self.failed += 1
+                values = {"status": "failed", "run_at": now + timedelta(seconds=JOB_FAILED_COOLDOWN)}
+            else:
+                self.retried += 1
+                delay = self.retry_backoff * (2 ** (attempts - 1))
+                values = {"status": "pending", "run_at": now + timedelta(seconds=delay)}
+            await db.execute(update(AIJob).where(self._current(job)).values(last_error=str(error)[:1000], **values))
+            await db.commit()
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "concurrency": self.concurrency,
+            "running": len(self._running),
+            "claimed": self.claimed,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
@@ -0,0 +1,132 @@
+import asyncio
+import random
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
+import openai
+from config import (
+    LLM_MODEL, LLM_MAX_CONCURRENCY, LLM_TIMEOUT, LLM_MAX_RETRIES, LLM_RETRY_BACKOFF, EMBEDDING_MODEL, EMBEDDING_DIM,
+)
+from llm_backends import LLMBackend, TransientLLMError, create_backend
+
+logger = logging.getLogger(__name__)
+
+# 可重试的错误：超时、连接失败、限流与服务端 5xx
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    TransientLLMError,
+)
+
+
+class LLMClient:
+    """异步 LLM 客户端：并发上限、单次超时与指数退避重试"""
+
+    def __init__(self, backend: LLMBackend = None, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 timeout: float = LLM_TIMEOUT, max_retries: int = LLM_MAX_RETRIES,
+                 backoff: float = LLM_RETRY_BACKOFF, model: str = LLM_MODEL,
+                 embedding_model: str = EMBEDDING_MODEL, embedding_dim: int = EMBEDDING_DIM):
+        self.backend = backend or create_backend()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.model = model
+        self.embedding_model = embedding_model
+        self.embedding_dim = embedding_dim
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+
+    @asynccontextmanager
+    async def _slot(self):
+        """排队获取并发名额，记录排队与执行中的请求数"""
+        self.waiting += 1
+        acquired = False
+        try:
+            await self._semaphore.acquire()
+            acquired = True
+            self.waiting -= 1
+            self.in_flight += 1
+            yield
+        finally:
+            if acquired:
+                self.in_flight -= 1
+                self._semaphore.release()
+            else:
+                self.waiting -= 1
+
+    async def complete(self, prompt: str) -> str:
+        """排队获取并发名额后调用模型，返回完整回复文本"""
+        async with self._slot():
+            content = await self._with_retry(lambda: self.backend.complete(self.model, prompt, self.timeout))
+            self.completed += 1
+            return content
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """流式调用模型，逐段产出回复文本。
+
+        只在建立连接阶段重试，已经开始输出后出错直接抛出；两个分片之间超过 timeout 视为超时。
+        """
+        async with self._slot():
+            pieces = await self._with_retry(lambda: self.backend.stream(self.model, prompt, self.timeout))
+            try:
+                while True:
+                    try:
+                        piece = await asyncio.wait_for(pieces.__anext__(), timeout=self.timeout)
+                    except StopAsyncIteration:
+                        break
+                    yield piece
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                await pieces.aclose()
+            self.completed += 1
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """计算一批文本的向量，与对话请求共用并发名额与重试策略"""
+        async with self._slot():
+            vectors = await self._with_retry(
+                lambda: self.backend.embed(self.embedding_model, texts, self.embedding_dim, self.timeout)
+            )
+            self.completed += 1
+            return vectors
+
+    async def _with_retry(self, call):
+        attempt = 0
+        while True:
+            try:
+                return await asyncio.wait_for(call(), timeout=self.timeout)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    self.failed += 1
+                    raise
+                delay = self.backoff * (2 ** attempt) * (1 + random.random())
+                attempt += 1
+                self.retries += 1
+                logger.warning(f"LLM call failed ({e!r}), retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            except Exception:
+                self.failed += 1
+                raise
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "backend": self.backend.name,
+        }
+
+
+llm = LLMClient()
@@ -0,0 +1,84 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List
+from openai import AsyncOpenAI
+from config import OPENAI_API_KEY, OPENAI_BASE_URL, LLM_BACKEND
+
+
+class TransientLLMError(Exception):
+    """后端返回的可重试错误（非 OpenAI SDK 的后端使用）"""
+
+
+class LLMBackend(ABC):
+    """模型后端接口：complete 返回完整文本，stream 建立连接后返回逐段文本的异步迭代器，embed 返回向量"""
+
+    name = "base"
+
+    @abstractmethod
+    async def complete(self, model: str, prompt: str, timeout: float) -> str:
+        ...
+
+    @abstractmethod
+    async def stream(self, model: str, prompt: str, timeout: float) -> AsyncIterator[str]:
+        ...
+
+    @abstractmethod
+    async def embed(self, model: str, texts: List[str], dim: int, timeout: float) -> List[List[float]]:
+        ...
+
+
+class OpenAIBackend(LLMBackend):
+    """兼容 OpenAI 接口的服务（默认 DashScope）"""
+
+    name = "openai"
+
+    def __init__(self, api_key: str = OPENAI_API_KEY, base_url: str = OPENAI_BASE_URL):
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client = None
+
+    def client(self, timeout: float) -> AsyncOpenAI:
+        # 首次调用时再创建，缺少 API Key 时服务仍可启动；重试由 LLMClient 负责，SDK 自身不再重试
+        if self._client is None:
+            self._client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, timeout=timeout, max_retries=0)
+        return self._client
+
+    async def complete(self, model: str, prompt: str, timeout: float) -> str:
+        response = await self.client(timeout).chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        return response.choices[0].message.content
+
+    async def stream(self, model: str, prompt: str, timeout: float) -> AsyncIterator[str]:
+        response = await self.client(timeout).chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+        )
+        return self._deltas(response)
+
+    async def embed(self, model: str, texts: List[str], dim: int, timeout: float) -> List[List[float]]:
+        # 显式要求浮点数组，部分兼容接口不支持 SDK 默认的 base64 格式
+        response = await self.client(timeout).embeddings.create(
+            model=model, input=texts, dimensions=dim, encoding_format="float",
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    @staticmethod
+    async def _deltas(response):
+        try:
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await response.close()
+
+
+def create_backend(name: str = LLM_BACKEND) -> LLMBackend:
+    if name == "openai":
+        return OpenAIBackend()
+    if name == "fake":
+        from fake_llm import FakeBackend
+
+        return FakeBackend()
+    raise ValueError(f"Unknown LLM backend: {name}")
@@ -0,0 +1,118 @@
+"""按目标 RPS 压测 /ai/summarize/，输出延迟分位数、吞吐量与事件循环延迟。
+
+配合模拟后端离线运行：
+    LLM_BACKEND=fake uvicorn main:app --port 8004
+    python loadtest.py --rps 50 --duration 30
+
+请求按固定间隔发出（开环），不等待前一个请求返回；延迟从计划发送时刻算起，
+服务变慢时排队时间也计入结果。默认每个请求的文本都不同，避免命中摘要缓存。
+"""
+import json
+import time
+import asyncio
+import argparse
+from typing import List, Optional
+import httpx
+from loop_lag import LoopLagMonitor
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+def make_text(i: int, size: int, unique: bool) -> str:
+    base = "今天的博客介绍了异步服务的性能调优方法，包括连接池、缓存与并发控制。"
+    text = (base * (size // len(base) + 1))[:size]
+    return f"{text}（第 {i} 篇）" if unique else text
+
+
+async def fetch_metrics(client: httpx.AsyncClient, url: Optional[str]):
+    if not url:
+        return None
+    try:
+        response = await client.get(url)
+        return response.json()
+    except Exception as e:
+        print(f"Failed to fetch metrics: {e}")
+        return None
+
+
+async def run(args):
+    latencies = []
+    statuses = {}
+    errors = 0
+    lag = LoopLagMonitor()
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        await lag.start()
+        total = int(args.rps * args.duration)
+        started = time.perf_counter()
+
+        async def one(i: int, scheduled: float):
+            nonlocal errors
+            try:
+                response = await client.post(args.url, json={"text": make_text(i, args.text_size, not args.same_text)})
+                key = str(response.status_code)
+                # 服务出错时仍返回 200 和 {"error": ...}
+                if response.status_code == 200 and "error" in response.json():
+                    key = "200-error"
+            except Exception as e:
+                key = type(e).__name__
+            if key != "200":
+                errors += 1
+            statuses[key] = statuses.get(key, 0) + 1
+            latencies.append(time.perf_counter() - scheduled)
+
+        tasks = []
+        for i in range(total):
+            scheduled = started + i / args.rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(i, scheduled)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        await lag.close()
+        server = await fetch_metrics(client, args.metrics_url)
+
+    report = {
+        "requests": total,
+        "target_rps": args.rps,
+        "throughput_rps": round(total / elapsed, 2),
+        "errors": errors,
+        "statuses": statuses,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99": round(percentile(latencies, 0.99) * 1000, 1),
+            "max": round(max(latencies, default=0.0) * 1000, 1),
+        },
+        # 压测端自身的事件循环延迟，过高说明压测端已成为瓶颈
+        "client_loop_lag": lag.stats(),
+    }
+    if server is not None:
+        report["server_loop_lag"] = server.get("loop_lag")
+        report["server_llm"] = server.get("llm")
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for /ai/summarize/")
+    parser.add_argument("--url", default="http://localhost:8004/ai/summarize/")
+    parser.add_argument("--metrics-url", default="http://localhost:8004/ai/metrics",
+                        help="服务端指标地址，传空字符串则不采集")
+    parser.add_argument("--rps", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="秒")
+    parser.add_argument("--text-size", type=int, default=500, help="每个请求的文本字数")
+    parser.add_argument("--same-text", action="store_true", help="所有请求使用相同文本（测缓存命中）")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--max-connections", type=int, default=1000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import time
+import asyncio
+from collections import deque
+
+
+class LoopLagMonitor:
+    """定时休眠并测量实际唤醒的延后量，反映事件循环被阻塞的程度"""
+
+    def __init__(self, interval: float = 0.01, window: int = 6000):
+        self.interval = interval
+        self._samples = deque(maxlen=window)
+        self._task = None
+        self.max_lag = 0.0
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - started - self.interval, 0.0)
+            self._samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def reset(self):
+        self._samples.clear()
+        self.max_lag = 0.0
+
+    def stats(self) -> dict:
+        samples = sorted(self._samples)
+        if not samples:
+            return {"samples": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        return {
+            "samples": len(samples),
+            "p50_ms": round(samples[len(samples) // 2] * 1000, 2),
+            "p99_ms": round(samples[min(int(len(samples) * 0.99), len(samples) - 1)] * 1000, 2),
+            "max_ms": round(self.max_lag * 1000, 2),
+        }
+
+
+loop_lag = LoopLagMonitor()
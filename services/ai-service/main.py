@@ -1,13 +1,25 @@
-from fastapi import FastAPI, HTTPException, APIRouter, Depends
+from fastapi import FastAPI, HTTPException, APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from openai import OpenAI
 import socket
 import httpx
-from database.database import init_db, get_db
+from database.database import init_db, get_db, pool_stats, SessionLocal
 from sqlalchemy.ext.asyncio import AsyncSession
-from config import OPENAI_API_KEY, OPENAI_BASE_URL
-import spacy
-import re
+from database.models import Article as DBArticle
+from sqlalchemy.future import select
+import chunking
+import jobs
+from llm import llm
+from loop_lag import loop_lag
+from nlp_pool import nlp_batcher
+from summary_cache import summary_cache
+from embeddings import (
+    EMBEDDING_JOB_CONCURRENCY, RELATED_DEFAULT_K, RELATED_MAX_K, embed_article, embedding_index, missing_embedding_ids,
+)
+from summaries import (
+    SUMMARY_JOB_CONCURRENCY, article_text, content_hash, is_current, load_summary, summarize_article,
+    stream_summary, summarize_cached, summary_dict,
+)
 
 app = FastAPI(title="AI Service")
 
@@ -17,19 +29,29 @@ SERVICE_PORT = 8004
 CONSUL_HOST = "consul"
 CONSUL_PORT = 8500
 
-client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
-
-# 加载 spaCy 中文模型
-nlp = spacy.load("zh_core_web_sm")
-
 class TextData(BaseModel):
     text: str
 
 router = APIRouter(prefix="/ai", tags=["AI"])
 
+# 后台摘要任务：文章创建/更新时由 article-service 入队
+summary_worker = jobs.JobWorker(jobs.SUMMARY, summarize_article, SUMMARY_JOB_CONCURRENCY)
+# 相关文章向量：文章创建/更新/删除时入队
+embedding_worker = jobs.JobWorker(jobs.EMBEDDING, embed_article, EMBEDDING_JOB_CONCURRENCY)
+
 @app.on_event("startup")
 async def startup_event():
     await init_db()
+    # spaCy 中文模型在进程池中加载
+    await nlp_batcher.start()
+    await summary_worker.start()
+    await embedding_index.start()
+    # 补齐历史文章与换模型后的向量
+    async with SessionLocal() as db:
+        await jobs.enqueue_missing(db, jobs.EMBEDDING, await missing_embedding_ids(db))
+        await db.commit()
+    await embedding_worker.start()
+    await loop_lag.start()
     ip = socket.gethostbyname(socket.gethostname())
     url = f"http://{CONSUL_HOST}:{CONSUL_PORT}/v1/agent/service/register"
     data = {
@@ -49,57 +71,108 @@ async def startup_event():
         except Exception as e:
             print(f"Failed to register with Consul: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await loop_lag.close()
+    await embedding_worker.close()
+    await embedding_index.close()
+    await summary_worker.close()
+    await nlp_batcher.close()
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/db/pool")
+async def db_pool():
+    return pool_stats()
+
+@router.get("/metrics")
+async def metrics():
+    return {
+        "llm": llm.stats(),
+        "nlp": nlp_batcher.stats(),
+        "summary_cache": summary_cache.stats(),
+        "chunking": chunking.stats(),
+        "loop_lag": loop_lag.stats(),
+        "summary_jobs": summary_worker.stats(),
+        "embeddings": embedding_index.stats(),
+        "embedding_jobs": embedding_worker.stats(),
+    }
+
 @router.post("/summarize/")
 async def summarize(text_data: TextData):
     try:
-        # 文本预处理
-        doc = nlp(text_data.text)
-        tokens = [token.text for token in doc]
-        entities = [{"text": ent.text, "label": ent.label_} for ent in doc.ents]
-
-        # 构造提示词
-        prompt = f"""
-请对以下文本执行以下操作，并按照如下格式返回：
-
-【总结】：xxx  
-【情感】：xxx  
-【关键词】：关键词1，关键词2，关键词3...
-
-文本原文：
-{text_data.text}
-
-辅助信息：
-- 分词（前30个）：{', '.join(tokens[:30])}
-- 实体识别：{', '.join([f"{e['text']}({e['label']})" for e in entities])}
-        """
-
-        response = client.chat.completions.create(
-            model="qwen-plus",
-            messages=[
-                {"role": "user", "content": prompt.strip()}
-            ],
-        )
-
-        content = response.choices[0].message.content
-
-        # 正则解析结果
-        summary = re.search(r"【总结】：(.+?)\n", content)
-        sentiment = re.search(r"【情感】：(.+?)\n", content)
-        keywords = re.search(r"【关键词】：(.+)", content)
-
-        return {
-            "summary": summary.group(1).strip() if summary else None,
-            "sentiment": sentiment.group(1).strip() if sentiment else None,
-            "keywords": [kw.strip() for kw in keywords.group(1).split("，")] if keywords else [],
-        }
+        return await summarize_cached(text_data.text)
 
     except Exception as e:
         print(f"错误信息：{e}")
         print("请参考文档：https://help.aliyun.com/zh/model-studio/developer-reference/error-code")
         return {"error": str(e)}
 
+@router.post("/summarize/stream")
+async def summarize_stream(text_data: TextData):
+    # 逐段推送，禁止中间代理缓冲
+    return StreamingResponse(
+        stream_summary(text_data.text),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/summaries/{article_id}")
+async def get_article_summary(article_id: int, db: AsyncSession = Depends(get_db)):
+    """返回预计算的摘要；缺失或正文已变化时确保已排队，并返回 pending / stale / failed"""
+    result = await db.execute(select(DBArticle.title, DBArticle.content).where(DBArticle.id == article_id))
+    article = result.first()
+    if article is None:
+        raise HTTPException(status_code=404, detail="Article not found")
+
+    row = await load_summary(db, article_id)
+    if row is not None and is_current(row, content_hash(article_text(article.title, article.content))):
+        return {"article_id": article_id, "status": "ready", **summary_dict(row)}
+
+    await jobs.enqueue_missing(db, jobs.SUMMARY, [article_id])
+    await db.commit()
+    # 重试耗尽的任务在冷却期内如实返回失败原因，冷却结束后的下一次请求会重新入队
+    error = await jobs.failed_error(db, jobs.SUMMARY, article_id)
+    if error is not None:
+        previous = summary_dict(row) if row is not None else {}
+        return {"article_id": article_id, "status": "failed", "last_error": error, **previous}
+    if row is None:
+        return {"article_id": article_id, "status": "pending"}
+    return {"article_id": article_id, "status": "stale", **summary_dict(row)}
+
+@router.get("/related/{article_id}")
+async def get_related_articles(
+    article_id: int,
+    k: int = Query(RELATED_DEFAULT_K, ge=1, le=RELATED_MAX_K),
+    db: AsyncSession = Depends(get_db),
+):
+    """按向量余弦相似度返回相关文章；向量尚未生成时排队并返回 pending，重试耗尽时返回 failed"""
+    result = await db.execute(select(DBArticle.id).where(DBArticle.id == article_id))
+    if result.scalar() is None:
+        raise HTTPException(status_code=404, detail="Article not found")
+
+    if not embedding_index.contains(article_id):
+        await jobs.enqueue_missing(db, jobs.EMBEDDING, [article_id])
+        await db.commit()
+        error = await jobs.failed_error(db, jobs.EMBEDDING, article_id)
+        if error is not None:
+            return {"article_id": article_id, "status": "failed", "last_error": error, "items": []}
+        return {"article_id": article_id, "status": "pending", "items": []}
+
+    hits = embedding_index.related(article_id, k)
+    titles = {}
+    if hits:
+        result = await db.execute(
+            select(DBArticle.id, DBArticle.title).where(DBArticle.id.in_([related_id for related_id, _ in hits]))
+        )
+        titles = dict(result.all())
+    # 已删除但尚未同步出矩阵的文章直接跳过
+    items = [
+        {"id": related_id, "title": titles[related_id], "score": round(score, 4)}
+        for related_id, score in hits if related_id in titles
+    ]
+    return {"article_id": article_id, "status": "ready", "items": items}
+
 app.include_router(router)
\ No newline at end of file
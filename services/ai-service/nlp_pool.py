@@ -0,0 +1,120 @@
+import os
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+NLP_MODEL = os.getenv("NLP_MODEL", "zh_core_web_sm")
+NLP_WORKERS = int(os.getenv("NLP_WORKERS", str(os.cpu_count() or 1)))
+NLP_BATCH_SIZE = int(os.getenv("NLP_BATCH_SIZE", "16"))
+NLP_BATCH_WAIT_MS = float(os.getenv("NLP_BATCH_WAIT_MS", "5"))
+# 提示词只用到分词和实体，其余组件默认关闭
+NLP_DISABLE = [name for name in os.getenv("NLP_DISABLE", "tagger,parser,attribute_ruler,lemmatizer").split(",") if name]
+# 提示词只使用前 30 个分词，只回传这部分以减少进程间传输
+MAX_TOKENS = 30
+
+_nlp = None
+
+
+def _init_worker(model: str, disabled: List[str]):
+    """在工作进程中加载一次 spaCy 模型"""
+    global _nlp
+    import spacy
+
+    _nlp = spacy.load(model)
+    _nlp.select_pipes(disable=[name for name in disabled if name in _nlp.pipe_names])
+
+
+def _process_batch(texts: List[str]):
+    results = []
+    for doc in _nlp.pipe(texts, batch_size=len(texts)):
+        tokens = [token.text for token in doc[:MAX_TOKENS]]
+        entities = [{"text": ent.text, "label": ent.label_} for ent in doc.ents]
+        results.append((tokens, entities))
+    return results
+
+
+class NLPBatcher:
+    """把并发请求攒成小批次，交给进程池中的 nlp.pipe 处理，不阻塞事件循环"""
+
+    def __init__(self, workers: int = NLP_WORKERS, batch_size: int = NLP_BATCH_SIZE,
+                 batch_wait_ms: float = NLP_BATCH_WAIT_MS, model: str = NLP_MODEL):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self.model = model
+        self._executor = None
+        self._queue = None
+        self._task = None
+        self._dispatching = set()
+        self.batches = 0
+        self.texts = 0
+
+    async def start(self):
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(self.model, NLP_DISABLE)
+        )
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._collect())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def analyze(self, text: str) -> Tuple[List[str], List[dict]]:
+        """返回 (前 30 个分词, 实体列表)"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # 派发后立即收集下一批，多个批次可在不同工作进程上并行
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatching.add(task)
+            task.add_done_callback(self._dispatching.discard)
+
+    async def _dispatch(self, batch):
+        texts = [text for text, _ in batch]
+        self.batches += 1
+        self.texts += len(texts)
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self._executor, _process_batch, texts)
+        except Exception as e:
+            logger.error(f"NLP batch of {len(texts)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+nlp_batcher = NLPBatcher()
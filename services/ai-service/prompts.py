@@ -0,0 +1,97 @@
+import re
+from typing import List
+
+# 修改提示词或解析规则时递增，旧的缓存结果随之失效
+PROMPT_VERSION = "v1"
+
+
+def build_prompt(text: str, tokens: List[str], entities: List[dict]) -> str:
+    """构造摘要提示词"""
+    prompt = f"""
+请对以下文本执行以下操作，并按照如下格式返回：
+
+【总结】：xxx  
+【情感】：xxx  
+【关键词】：关键词1，关键词2，关键词3...
+
+文本原文：
+{text}
+
+辅助信息：
+- 分词（前30个）：{', '.join(tokens[:30])}
+- 实体识别：{', '.join([f"{e['text']}({e['label']})" for e in entities])}
+        """
+    return prompt.strip()
+
+
+def build_chunk_prompt(chunk: str) -> str:
+    """长文分段摘要（map 阶段），只要求提炼要点；不含段落序号，便于按片段内容缓存"""
+    prompt = f"""
+以下是一篇长文中的一个片段，请用简洁的中文概括这一片段的要点，直接输出概括内容，不要添加其他说明。
+
+文本片段：
+{chunk}
+        """
+    return prompt.strip()
+
+
+def build_reduce_prompt(partials: List[str]) -> str:
+    """汇总各部分要点（reduce 阶段），输出格式与 build_prompt 一致"""
+    sections = "\n".join(f"{i + 1}. {partial}" for i, partial in enumerate(partials))
+    prompt = f"""
+以下是一篇长文按顺序分段后各部分的要点，请基于这些要点对全文执行以下操作，并按照如下格式返回：
+
+【总结】：xxx  
+【情感】：xxx  
+【关键词】：关键词1，关键词2，关键词3...
+
+各部分要点：
+{sections}
+        """
+    return prompt.strip()
+
+
+def parse_summary(content: str) -> dict:
+    """正则解析模型返回的结果"""
+    summary = re.search(r"【总结】：(.+?)\n", content)
+    sentiment = re.search(r"【情感】：(.+?)\n", content)
+    keywords = re.search(r"【关键词】：(.+)", content)
+
+    return {
+        "summary": summary.group(1).strip() if summary else None,
+        "sentiment": sentiment.group(1).strip() if sentiment else None,
+        "keywords": [kw.strip() for kw in keywords.group(1).split("，")] if keywords else [],
+    }
+
+
+# 流式输出时按行判断字段是否已完整
+FIELD_PATTERNS = (
+    ("summary", re.compile(r"【总结】：(.+?)\n")),
+    ("sentiment", re.compile(r"【情感】：(.+?)\n")),
+)
+
+
+class SummaryStreamParser:
+    """增量解析流式回复，字段一旦完整立即产出；关键词在最后一行，结束时产出"""
+
+    def __init__(self):
+        self.content = ""
+        self._emitted = set()
+
+    def feed(self, text: str) -> List[tuple]:
+        self.content += text
+        fields = []
+        for name, pattern in FIELD_PATTERNS:
+            if name in self._emitted:
+                continue
+            match = pattern.search(self.content)
+            if match:
+                self._emitted.add(name)
+                fields.append((name, match.group(1).strip()))
+        return fields
+
+    def finish(self):
+        """返回 (完整结果, 尚未产出的字段)"""
+        result = parse_summary(self.content)
+        fields = [(name, value) for name, value in result.items() if name not in self._emitted]
+        return result, fields
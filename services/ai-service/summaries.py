@@ -0,0 +1,128 @@
+import os
+import json
+import hashlib
+from typing import AsyncIterator, Optional
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import LLM_MODEL
+from database.database import SessionLocal
+from database.models import Article as DBArticle
+from database.models import ArticleSummary as DBArticleSummary
+from llm import llm
+from nlp_pool import nlp_batcher
+from chunking import is_long, map_chunks
+from prompts import PROMPT_VERSION, SummaryStreamParser, build_prompt, build_reduce_prompt, parse_summary
+from summary_cache import normalize_text, summary_cache, summary_key
+
+SUMMARY_JOB_CONCURRENCY = int(os.getenv("SUMMARY_JOB_CONCURRENCY", "4"))
+
+
+async def build_summary_prompt(text: str) -> str:
+    # 长文先分段摘要，再把各段要点汇总成一次请求
+    if await is_long(text):
+        return build_reduce_prompt(await map_chunks(text))
+
+    # 文本预处理（进程池中批量执行）
+    tokens, entities = await nlp_batcher.analyze(text)
+    return build_prompt(text, tokens, entities)
+
+
+async def summarize_text(text: str) -> dict:
+    # 异步调用模型（受并发上限与超时约束）
+    content = await llm.complete(await build_summary_prompt(text))
+    return parse_summary(content)
+
+
+async def summarize_cached(text: str) -> dict:
+    """相同文本（规范化后）直接返回缓存结果"""
+    return await summary_cache.get_or_compute(summary_key(text), lambda: summarize_text(text))
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_summary(text: str) -> AsyncIterator[str]:
+    """以 SSE 事件流输出摘要：token 为模型原始分片，field 为已解析出的字段，done 为完整结果"""
+    key = summary_key(text)
+    try:
+        cached = await summary_cache.lookup(key)
+        if cached is not None:
+            for name in ("summary", "sentiment", "keywords"):
+                yield sse_event("field", {"name": name, "value": cached[name]})
+            yield sse_event("done", cached)
+            return
+
+        prompt = await build_summary_prompt(text)
+        parser = SummaryStreamParser()
+        async for piece in llm.stream(prompt):
+            yield sse_event("token", {"text": piece})
+            for name, value in parser.feed(piece):
+                yield sse_event("field", {"name": name, "value": value})
+
+        result, fields = parser.finish()
+        for name, value in fields:
+            yield sse_event("field", {"name": name, "value": value})
+        yield sse_event("done", result)
+        await summary_cache.put(key, result)
+    except Exception as e:
+        # 响应头已发送，错误只能作为事件告知客户端
+        print(f"错误信息：{e}")
+        yield sse_event("error", {"error": str(e)})
+
+
+def article_text(title: str, content: str) -> str:
+    return f"{title}\n\n{content}"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def is_current(row: DBArticleSummary, text_hash: str) -> bool:
+    return row.content_hash == text_hash and row.model == LLM_MODEL and row.prompt_version == PROMPT_VERSION
+
+
+def summary_dict(row: DBArticleSummary) -> dict:
+    return {
+        "summary": row.summary,
+        "sentiment": row.sentiment,
+        "keywords": json.loads(row.keywords) if row.keywords else [],
+        "updated_at": row.updated_at,
+    }
+
+
+async def load_summary(db: AsyncSession, article_id: int) -> Optional[DBArticleSummary]:
+    result = await db.execute(select(DBArticleSummary).where(DBArticleSummary.article_id == article_id))
+    return result.scalars().first()
+
+
+async def summarize_article(article_id: int):
+    """后台任务：正文未变化时跳过，否则生成摘要并写入 article_summaries"""
+    # 调用模型期间不占用数据库连接
+    async with SessionLocal() as db:
+        result = await db.execute(select(DBArticle.title, DBArticle.content).where(DBArticle.id == article_id))
+        article = result.first()
+        if article is None:
+            return
+        text = article_text(article.title, article.content)
+        text_hash = content_hash(text)
+        existing = await load_summary(db, article_id)
+        if existing is not None and is_current(existing, text_hash):
+            return
+
+    result = await summarize_cached(text)
+    if result.get("summary") is None:
+        raise ValueError("model response could not be parsed")
+
+    async with SessionLocal() as db:
+        await db.merge(DBArticleSummary(
+            article_id=article_id,
+            content_hash=text_hash,
+            summary=result["summary"],
+            sentiment=result["sentiment"],
+            keywords=json.dumps(result["keywords"], ensure_ascii=False),
+            model=LLM_MODEL,
+            prompt_version=PROMPT_VERSION,
+        ))
+        await db.commit()
@@ -0,0 +1,158 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+import logging
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+from sqlalchemy.future import select
+from config import LLM_MODEL
+from database.database import SessionLocal
+from database.models import SummaryCacheEntry
+from prompts import PROMPT_VERSION
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "2048"))
+SUMMARY_CACHE_PERSIST = os.getenv("SUMMARY_CACHE_PERSIST", "1") == "1"
+
+
+def normalize_text(text: str) -> str:
+    """全半角统一、合并空白，避免格式差异导致缓存未命中"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def summary_key(text: str, model: str = LLM_MODEL, prompt_version: str = PROMPT_VERSION) -> str:
+    raw = f"{model}\0{prompt_version}\0{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """内容寻址的摘要缓存：内存 LRU + 可选持久化表，并发未命中合并为一次计算"""
+
+    def __init__(self, maxsize: int = SUMMARY_CACHE_SIZE, persist: bool = SUMMARY_CACHE_PERSIST,
+                 model: str = LLM_MODEL, prompt_version: str = PROMPT_VERSION):
+        self.maxsize = maxsize
+        self.persist = persist
+        self.model = model
+        self.prompt_version = prompt_version
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    async def lookup(self, key: str) -> Optional[dict]:
+        """只查缓存（内存，其次持久化表），不触发计算"""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        value = await self._load(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.persistent_hits += 1
+        self._remember(key, value)
+        return value
+
+    async def put(self, key: str, value: dict):
+        if self._cacheable(value):
+            self._remember(key, value)
+            await self._save(key, value)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[dict]]) -> dict:
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            # 同一文本已在计算中，等待同一个结果
+            self.coalesced += 1
+        else:
+            # 计算在独立任务中进行，任何一个调用方（包括发起者）被取消都不影响其他等待者
+            task = asyncio.create_task(self._compute(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[dict]]) -> dict:
+        value = await self._load(key)
+        if value is not None:
+            self.persistent_hits += 1
+        else:
+            self.misses += 1
+            value = await compute()
+            if self._cacheable(value):
+                await self._save(key, value)
+        if self._cacheable(value):
+            self._remember(key, value)
+        return value
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 等待者都已取消时避免 "exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
+
+    @staticmethod
+    def _cacheable(value: dict) -> bool:
+        return bool(value) and "error" not in value and value.get("summary") is not None
+
+    def _remember(self, key: str, value: dict):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def _load(self, key: str) -> Optional[dict]:
+        if not self.persist:
+            return None
+        try:
+            async with SessionLocal() as db:
+                result = await db.execute(select(SummaryCacheEntry.result).where(SummaryCacheEntry.key == key))
+                raw = result.scalar()
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            logger.warning(f"Summary cache lookup failed: {e}")
+            return None
+
+    async def _save(self, key: str, value: dict):
+        if not self.persist:
+            return
+        try:
+            async with SessionLocal() as db:
+                await db.merge(SummaryCacheEntry(
+                    key=key,
+                    model=self.model,
+                    prompt_version=self.prompt_version,
+                    result=json.dumps(value, ensure_ascii=False),
+                ))
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Summary cache write failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
+
+
+summary_cache = SummaryCache()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 服务以 ai-service 目录为工作目录运行，模块按顶层导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
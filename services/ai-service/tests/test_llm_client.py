@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from fake_llm import FakeBackend, FakeLLMError
+from llm import LLMClient
+from llm_backends import LLMBackend
+
+
+def fake(**options) -> FakeBackend:
+    # 固定延迟与随机种子，结果可复现
+    return FakeBackend(**{"latency": "constant", "latency_ms": 5, "token_ms": 0, "seed": 7, **options})
+
+
+class CountingBackend(FakeBackend):
+    """记录同时执行中的请求数峰值"""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.active = 0
+        self.peak = 0
+
+    async def complete(self, model: str, prompt: str, timeout: float) -> str:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            return await super().complete(model, prompt, timeout)
+        finally:
+            self.active -= 1
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        LLMBackend()
+
+
+def test_transient_errors_are_retried():
+    client = LLMClient(fake(error_rate=0.5), max_concurrency=4, timeout=1, max_retries=20, backoff=0)
+
+    async def run():
+        return await asyncio.gather(*(client.complete(f"prompt {i}") for i in range(20)))
+
+    replies = asyncio.run(run())
+    assert all("【总结】" in reply for reply in replies)
+    assert client.retries > 0
+    assert client.completed == 20
+    assert client.failed == 0
+
+
+def test_fatal_errors_are_not_retried():
+    client = LLMClient(fake(fatal_rate=1), max_concurrency=4, timeout=1, max_retries=3, backoff=0)
+    with pytest.raises(FakeLLMError):
+        asyncio.run(client.complete("prompt"))
+    assert client.retries == 0
+    assert client.failed == 1
+
+
+def test_hanging_calls_time_out_after_retries():
+    client = LLMClient(fake(hang_rate=1), max_concurrency=4, timeout=0.05, max_retries=2, backoff=0)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(client.complete("prompt"))
+    assert client.retries == 2
+    assert client.failed == 1
+    assert client.stats()["in_flight"] == 0
+
+
+def test_concurrency_is_capped():
+    backend = CountingBackend(latency="constant", latency_ms=20, token_ms=0)
+    client = LLMClient(backend, max_concurrency=3, timeout=1, max_retries=0, backoff=0)
+    depths = []
+
+    async def run():
+        tasks = [asyncio.create_task(client.complete(f"prompt {i}")) for i in range(12)]
+        await asyncio.sleep(0.01)
+        depths.append(client.stats()["queue_depth"])
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert backend.peak == 3
+    assert depths == [9]
+    stats = client.stats()
+    assert stats["in_flight"] == 0
+    assert stats["queue_depth"] == 0
+    assert stats["completed"] == 12
+
+
+def test_stream_yields_full_reply():
+    client = LLMClient(fake(), max_concurrency=1, timeout=1, max_retries=0, backoff=0)
+
+    async def run():
+        return [piece async for piece in client.stream("prompt")]
+
+    assert "".join(asyncio.run(run())) == FakeBackend.reply("prompt")
+    assert client.completed == 1
@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import List, Optional
+import httpx
+from jose import jwt, JWTError, ExpiredSignatureError
+
+logger = logging.getLogger("api-gateway")
+
+# HS256 当前密钥与轮换前的旧密钥（逗号分隔），旧密钥签发的令牌在过期前仍可通过
+JWT_SECRET = os.getenv("JWT_SECRET", "a_random_secure_key_12345$%&*!")
+JWT_PREVIOUS_SECRETS = [s for s in os.getenv("JWT_PREVIOUS_SECRETS", "").split(",") if s]
+# RS256 公钥：本地 PEM 文件（逗号分隔）或 JWKS 地址
+JWT_PUBLIC_KEY_FILES = [p for p in os.getenv("JWT_PUBLIC_KEY_FILES", "").split(",") if p]
+JWT_JWKS_URL = os.getenv("JWT_JWKS_URL")
+JWT_JWKS_TTL = float(os.getenv("JWT_JWKS_TTL", "300"))
+# 遇到未知 kid 时强制刷新 JWKS 的最小间隔，防止伪造 kid 打满密钥服务
+JWT_JWKS_MIN_REFRESH = float(os.getenv("JWT_JWKS_MIN_REFRESH", "30"))
+JWT_CLAIMS_CACHE_SIZE = int(os.getenv("JWT_CLAIMS_CACHE_SIZE", "10000"))
+# 没有 exp 的令牌，解码结果最多缓存这么久
+JWT_CLAIMS_TTL = float(os.getenv("JWT_CLAIMS_TTL", "300"))
+
+SUPPORTED_ALGORITHMS = ("HS256", "RS256")
+USER_ID_HEADER = "X-User-Id"
+# 登录与注册本身就是为了换取令牌，携带的旧令牌无效时按匿名处理而不是返回 401
+PUBLIC_PATHS = {"/users/login", "/users/register"}
+
+# 当前请求已验证的令牌声明，转发上游时读取
+current_claims: ContextVar[Optional[dict]] = ContextVar("current_claims", default=None)
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class KeySet:
+    """验证密钥集合：静态配置的 HS/RS 密钥 + 定期刷新的 JWKS"""
+
+    def __init__(self, secrets: List[str], public_key_files: List[str], jwks_url: Optional[str],
+                 jwks_ttl: float = JWT_JWKS_TTL, min_refresh: float = JWT_JWKS_MIN_REFRESH):
+        self.static = [(None, "HS256", secret) for secret in secrets]
+        for path in public_key_files:
+            with open(path) as f:
+                self.static.append((None, "RS256", f.read()))
+        self.jwks_url = jwks_url
+        self.jwks_ttl = jwks_ttl
+        self.min_refresh = min_refresh
+        self._jwks = {}
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def candidates(self, kid: Optional[str], alg: str) -> list:
+        if self.jwks_url:
+            now = time.monotonic()
+            stale = now - self._fetched_at > self.jwks_ttl
+            unknown = kid is not None and kid not in self._jwks and now - self._fetched_at > self.min_refresh
+            if stale or unknown:
+                await self.refresh()
+        if kid is not None and kid in self._jwks:
+            return [self._jwks[kid]] if self._jwks[kid].get("alg", alg) == alg else []
+        keys = [key for _, key_alg, key in self.static if key_alg == alg]
+        if kid is None:
+            keys += [key for key in self._jwks.values() if key.get("alg", alg) == alg]
+        return keys
+
+    async def refresh(self):
+        async with self._lock:
+            # 等锁期间其他请求可能已经刷新过
+            if time.monotonic() - self._fetched_at <= self.min_refresh and self._jwks:
+                return
+            try:
+                async with httpx.AsyncClient(timeout=5.0) as client:
+                    response = await client.get(self.jwks_url)
+                    response.raise_for_status()
+                    keys = response.json().get("keys", [])
+                self._jwks = {key["kid"]: key for key in keys if "kid" in key}
+                logger.info(f"Loaded {len(self._jwks)} keys from JWKS")
+            except Exception as e:
+                # 刷新失败时继续使用旧密钥
+                logger.error(f"Failed to refresh JWKS: {e}")
+            self._fetched_at = time.monotonic()
+
+
+class TokenVerifier:
+    """本地验证 JWT，按令牌哈希缓存声明直到过期，命中时不做签名运算"""
+
+    def __init__(self, keys: KeySet, cache_size: int = JWT_CLAIMS_CACHE_SIZE):
+        self.keys = keys
+        self.cache_size = cache_size
+        self._claims: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def verify(self, token: str) -> dict:
+        digest = hashlib.sha256(token.encode()).digest()
+        cached = self._claims.get(digest)
+        if cached is not None:
+            claims, not_before, expires_at = cached
+            now = time.time()
+            if now < not_before:
+                raise InvalidToken("Token is not yet valid")
+            if expires_at > now:
+                self.hits += 1
+                self._claims.move_to_end(digest)
+                return claims
+            del self._claims[digest]
+        self.misses += 1
+
+        claims = await self._decode(token)
+        exp, nbf = claims.get("exp"), claims.get("nbf")
+        expires_at = float(exp) if isinstance(exp, (int, float)) else time.time() + JWT_CLAIMS_TTL
+        not_before = float(nbf) if isinstance(nbf, (int, float)) else 0.0
+        self._claims[digest] = (claims, not_before, expires_at)
+        while len(self._claims) > self.cache_size:
+            self._claims.popitem(last=False)
+        return claims
+
+    async def _decode(self, token: str) -> dict:
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError:
+            raise InvalidToken("Invalid token")
+        alg = header.get("alg")
+        if alg not in SUPPORTED_ALGORITHMS:
+            raise InvalidToken("Unsupported token algorithm")
+
+        for key in await self.keys.candidates(header.get("kid"), alg):
+            try:
+                return jwt.decode(token, key, algorithms=[alg])
+            except ExpiredSignatureError:
+                raise InvalidToken("Token has expired")
+            except JWTError:
+                # 签名不匹配时尝试下一个密钥（轮换期间新旧密钥并存）
+                continue
+        raise InvalidToken("Invalid token")
+
+    def stats(self) -> dict:
+        return {"cached": len(self._claims), "hits": self.hits, "misses": self.misses}
+
+
+verifier = TokenVerifier(KeySet([JWT_SECRET, *JWT_PREVIOUS_SECRETS], JWT_PUBLIC_KEY_FILES, JWT_JWKS_URL))
+
+
+def _bearer_token(headers) -> Optional[str]:
+    for name, value in headers:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token.strip()
+    return None
+
+
+class JWTAuthMiddleware:
+    """ASGI 中间件：有 Bearer 令牌时在本地验证，失败返回 401（登录、注册按匿名放行）；未携带令牌的请求按匿名放行。
+
+    客户端自带的身份头一律剔除，验证通过的身份由上游连接池统一加到转发请求上。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        identity_header = USER_ID_HEADER.lower().encode()
+        headers = [(name, value) for name, value in scope["headers"] if name != identity_header]
+        scope = dict(scope, headers=headers)
+
+        claims = None
+        token = _bearer_token(headers)
+        if token is not None:
+            try:
+                claims = await verifier.verify(token)
+            except InvalidToken as e:
+                if scope["path"].rstrip("/") not in PUBLIC_PATHS:
+                    await _unauthorized(send, str(e))
+                    return
+
+        reset = current_claims.set(claims)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_claims.reset(reset)
+
+
+async def _unauthorized(send, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 401,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"www-authenticate", b"Bearer"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def forward_identity(request: httpx.Request):
+    """httpx 请求钩子：把已验证的用户 id 加到发往上游的请求头"""
+    claims = current_claims.get()
+    if claims is not None and claims.get("sub") is not None:
+        request.headers[USER_ID_HEADER] = str(claims["sub"])
+    elif USER_ID_HEADER in request.headers:
+        del request.headers[USER_ID_HEADER]
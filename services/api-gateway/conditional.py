@@ -0,0 +1,90 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Request, Response
+from upstream import get_client
+
+VALIDATOR_TTL = float(os.getenv("GATEWAY_VALIDATOR_TTL", "5"))
+VALIDATOR_CACHE_SIZE = int(os.getenv("GATEWAY_VALIDATOR_CACHE_SIZE", "10000"))
+
+# 需要原样透传给客户端的上游响应头
+PASSTHROUGH_HEADERS = ("etag", "cache-control", "last-modified")
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class ValidatorCache:
+    """记录每个上游 GET 资源最近一次的 ETag，短时间内可直接在网关回答 304"""
+
+    def __init__(self, ttl: float = VALIDATOR_TTL, maxsize: int = VALIDATOR_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        etag, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        return etag
+
+    def store(self, key: str, etag: str):
+        self._entries[key] = (etag, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate_prefix(self, prefix: str):
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            del self._entries[key]
+
+
+validators = ValidatorCache()
+
+
+def _resource_key(service: str, path: str, request: Request) -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return f"{service}:{path}?{query}"
+
+
+def invalidate(service: str, path_prefix: str):
+    """写操作后失效该服务下对应路径的验证器"""
+    validators.invalidate_prefix(f"{service}:{path_prefix}")
+
+
+async def proxy_conditional_get(service: str, path: str, request: Request):
+    """转发 GET 请求并透传 If-None-Match / ETag；验证器仍新鲜时不访问上游。
+
+    返回 (上游响应或 None, 直接发送给客户端的 Response)。
+    """
+    key = _resource_key(service, path, request)
+    if_none_match = request.headers.get("if-none-match")
+
+    known = validators.get(key)
+    if known is not None and _etag_matches(if_none_match, known):
+        return None, Response(status_code=304, headers={"ETag": known})
+
+    headers = {"If-None-Match": if_none_match} if if_none_match else {}
+    upstream = await get_client(service).get(path, params=request.query_params, headers=headers)
+    passthrough = {name: upstream.headers[name] for name in PASSTHROUGH_HEADERS if name in upstream.headers}
+
+    etag = upstream.headers.get("etag")
+    if etag and upstream.status_code in (200, 304):
+        validators.store(key, etag)
+
+    if upstream.status_code == 304:
+        return upstream, Response(status_code=304, headers=passthrough)
+    return upstream, Response(
+        content=upstream.content,
+        status_code=upstream.status_code,
+        media_type=upstream.headers.get("content-type", "application/json"),
+        headers=passthrough,
+    )
@@ -6,9 +6,13 @@ from routes.user_routes import router as user_router
 from routes.article_routes import router as article_router
 from routes.comment_routes import router as comment_router
 from routes.ai_routes import router as ai_router 
+from upstream import upstreams
+from auth import JWTAuthMiddleware, verifier
 
 
 app = FastAPI(title="API Gateway")
+# 本地验证 JWT，不再访问用户服务
+app.add_middleware(JWTAuthMiddleware)
 
 SERVICE_NAME = "api-gateway"
 SERVICE_ID = "api-gateway-1"
@@ -22,6 +26,7 @@ logger.setLevel(logging.INFO)
 
 @app.on_event("startup")
 async def startup_event():
+    await upstreams.start()
     ip = socket.gethostbyname(socket.gethostname())
     url = f"http://{CONSUL_HOST}:{CONSUL_PORT}/v1/agent/service/register"
     data = {
@@ -41,10 +46,18 @@ async def startup_event():
         except Exception as e:
             logger.error(f"Failed to register with Consul: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await upstreams.close()
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/auth/stats")
+def auth_stats():
+    return verifier.stats()
+
 app.include_router(user_router)
 app.include_router(article_router)
 app.include_router(comment_router)
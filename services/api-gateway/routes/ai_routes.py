@@ -1,14 +1,58 @@
-from fastapi import APIRouter, Request
-from httpx import AsyncClient, Timeout
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import StreamingResponse
+from upstream import get_client
 
 router = APIRouter(prefix="/ai", tags=["AI"])
 
-AI_SERVICE_URL = "http://ai_service:8004/ai"
+AI_SERVICE = "ai_service"
 
 
 @router.post("/summarize/")
 async def summarize(request: Request):
     body = await request.json()
-    async with AsyncClient(timeout=Timeout(60.0)) as client:
-        response = await client.post(f"{AI_SERVICE_URL}/summarize/", json=body)
-    return response.json()
\ No newline at end of file
+    response = await get_client(AI_SERVICE).post("/ai/summarize/", json=body)
+    return response.json()
+
+
+@router.post("/summarize/stream")
+async def summarize_stream(request: Request):
+    body = await request.json()
+    client = get_client(AI_SERVICE)
+    upstream = await client.send(client.build_request("POST", "/ai/summarize/stream", json=body), stream=True)
+    if upstream.status_code != 200:
+        content = await upstream.aread()
+        await upstream.aclose()
+        return Response(content=content, status_code=upstream.status_code,
+                        media_type=upstream.headers.get("content-type"))
+
+    async def relay():
+        # 收到一块转发一块，不在网关缓冲；客户端断开时关闭上游连接
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        finally:
+            await upstream.aclose()
+
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/summaries/{article_id}")
+async def get_article_summary(article_id: int):
+    # 预计算的摘要，立即返回；尚未生成时 status 为 pending
+    response = await get_client(AI_SERVICE).get(f"/ai/summaries/{article_id}")
+    if response.status_code == 404:
+        return {"detail": "Article not found"}
+    return response.json()
+
+
+@router.get("/related/{article_id}")
+async def get_related_articles(article_id: int, request: Request):
+    # 透传 k；向量尚未生成时 status 为 pending
+    response = await get_client(AI_SERVICE).get(f"/ai/related/{article_id}", params=request.query_params)
+    if response.status_code == 404:
+        return {"detail": "Article not found"}
+    return response.json()
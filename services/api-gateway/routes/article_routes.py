@@ -1,48 +1,53 @@
 from fastapi import APIRouter, Request
-import httpx
+from upstream import get_client
+from conditional import proxy_conditional_get, invalidate
 
 router = APIRouter(prefix="/articles", tags=["Articles"])
 
-ARTICLE_SERVICE_URL = "http://article_service:8002/articles"
+ARTICLE_SERVICE = "article_service"
 
 @router.post("/")
 async def create_article(request: Request):
     body = await request.json()
-    async with httpx.AsyncClient(follow_redirects=True) as client:
-        response = await client.post(f"{ARTICLE_SERVICE_URL}/", json=body)
+    response = await get_client(ARTICLE_SERVICE).post("/articles/", json=body)
+    invalidate(ARTICLE_SERVICE, "/articles/")
     return response.json()
 
+@router.get("/search/")
+async def search_articles(request: Request):
+    # 须在 /{article_id}/ 之前注册；透传 q / limit / cursor / fields
+    _, response = await proxy_conditional_get(ARTICLE_SERVICE, "/articles/search", request)
+    return response
+
 @router.get("/{article_id}/")
-async def get_article(article_id: str):
-    async with httpx.AsyncClient(follow_redirects=True) as client:  # 启用自动跟随重定向
-        response = await client.get(f"{ARTICLE_SERVICE_URL}/{article_id}/")
-        if response.status_code == 404:
-            return {"detail": "Article not found"}
-        elif response.status_code != 200:
-            return {"detail": f"Error from article-service: {response.status_code}"}
-        return response.json()
+async def get_article(article_id: str, request: Request):
+    upstream, response = await proxy_conditional_get(ARTICLE_SERVICE, f"/articles/{article_id}/", request)
+    if upstream is not None and upstream.status_code == 404:
+        return {"detail": "Article not found"}
+    elif upstream is not None and upstream.status_code not in (200, 304):
+        return {"detail": f"Error from article-service: {upstream.status_code}"}
+    return response
 
 @router.get("/")
-async def get_articles():
-    async with httpx.AsyncClient(follow_redirects=True) as client:
-        response = await client.get(f"{ARTICLE_SERVICE_URL}/")
-    return response.json()
+async def get_articles(request: Request):
+    # 透传 limit / cursor 等查询参数
+    _, response = await proxy_conditional_get(ARTICLE_SERVICE, "/articles/", request)
+    return response
 
 @router.delete("/{article_id}/")
 async def delete_article(article_id: str):
-    async with httpx.AsyncClient(follow_redirects=True) as client:
-        response = await client.delete(f"{ARTICLE_SERVICE_URL}/{article_id}/")
+    response = await get_client(ARTICLE_SERVICE).delete(f"/articles/{article_id}/")
+    invalidate(ARTICLE_SERVICE, "/articles/")
     return response.json()
 
 @router.put("/{article_id}/")
 async def update_article(article_id: str, request: Request):
     body = await request.json()
-    async with httpx.AsyncClient(follow_redirects=True) as client:
-        response = await client.put(f"{ARTICLE_SERVICE_URL}/{article_id}/", json=body)
+    response = await get_client(ARTICLE_SERVICE).put(f"/articles/{article_id}/", json=body)
+    invalidate(ARTICLE_SERVICE, "/articles/")
     return response.json()
 
 @router.get("/tag/{tag_name}/")
-async def get_articles_by_tag(tag_name: str):
-    async with httpx.AsyncClient(follow_redirects=True) as client:
-        response = await client.get(f"{ARTICLE_SERVICE_URL}/tag/{tag_name}/")
-    return response.json()
\ No newline at end of file
+async def get_articles_by_tag(tag_name: str, request: Request):
+    _, response = await proxy_conditional_get(ARTICLE_SERVICE, f"/articles/tag/{tag_name}/", request)
+    return response
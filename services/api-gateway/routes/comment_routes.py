@@ -1,32 +1,48 @@
 from fastapi import APIRouter, Request
-import httpx
+from upstream import get_client
+from conditional import proxy_conditional_get, invalidate
 
 router = APIRouter(prefix="/comments", tags=["Comments"])
 
-COMMENT_SERVICE_URL = "http://comment_service:8003/comments"
+COMMENT_SERVICE = "comment_service"
+ARTICLE_SERVICE = "article_service"
+
+
+def invalidate_comment_counts():
+    # 文章列表与详情都带评论数
+    invalidate(ARTICLE_SERVICE, "/articles/")
 
 @router.post("/")
 async def add_comment(request: Request):
     body = await request.json()
-    async with httpx.AsyncClient(follow_redirects=True) as client:
-        response = await client.post(f"{COMMENT_SERVICE_URL}/", json=body)
-    return response.json()  
+    response = await get_client(COMMENT_SERVICE).post("/comments/", json=body)
+    invalidate(COMMENT_SERVICE, f"/comments/article/{body.get('article_id')}/")
+    invalidate_comment_counts()
+    return response.json()
 
 @router.get("/article/{article_id}/")
-async def get_comments_by_article(article_id: str):
-    async with httpx.AsyncClient(follow_redirects=True) as client:
-        response = await client.get(f"{COMMENT_SERVICE_URL}/article/{article_id}/")
-        return response.json()
-    
+async def get_comments_by_article(article_id: str, request: Request):
+    # 透传 limit / cursor / mode 等查询参数
+    _, response = await proxy_conditional_get(COMMENT_SERVICE, f"/comments/article/{article_id}/", request)
+    return response
+
+@router.get("/{comment_id}/replies/")
+async def get_comment_replies(comment_id: str, request: Request):
+    _, response = await proxy_conditional_get(COMMENT_SERVICE, f"/comments/{comment_id}/replies/", request)
+    return response
+
 @router.delete("/{comment_id}/")
 async def delete_comment(comment_id: str):
-    async with httpx.AsyncClient(follow_redirects=True) as client:
-        response = await client.delete(f"{COMMENT_SERVICE_URL}/{comment_id}/")
-        return response.json()
+    response = await get_client(COMMENT_SERVICE).delete(f"/comments/{comment_id}/")
+    # 删除请求不带文章 ID，失效全部评论验证器
+    invalidate(COMMENT_SERVICE, "/comments/")
+    invalidate_comment_counts()
+    return response.json()
 
 @router.post("/reply/")
 async def add_reply(request: Request):
     body = await request.json()
-    async with httpx.AsyncClient(follow_redirects=True) as client:
-        response = await client.post(f"{COMMENT_SERVICE_URL}/reply/", json=body)
-    return response.json()
\ No newline at end of file
+    response = await get_client(COMMENT_SERVICE).post("/comments/reply/", json=body)
+    invalidate(COMMENT_SERVICE, f"/comments/article/{body.get('article_id')}/")
+    invalidate_comment_counts()
+    return response.json()
@@ -0,0 +1,84 @@
+import os
+import logging
+import httpx
+from auth import forward_identity
+
+logger = logging.getLogger("api-gateway")
+
+# HTTP/2 需要可选依赖 h2；未安装时退回 HTTP/1.1 keep-alive
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# 各上游服务的默认配置，均可通过环境变量覆盖，例如：
+#   ARTICLE_SERVICE_URL / ARTICLE_SERVICE_MAX_CONNECTIONS / ARTICLE_SERVICE_TIMEOUT
+UPSTREAMS = {
+    "user_service": {"base_url": "http://user_service:8001", "timeout": 10.0},
+    "article_service": {"base_url": "http://article_service:8002", "timeout": 10.0},
+    "comment_service": {"base_url": "http://comment_service:8003", "timeout": 10.0},
+    "ai_service": {"base_url": "http://ai_service:8004", "timeout": 60.0},
+}
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE = 20
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+
+
+def _env(name: str, key: str, default, cast=str):
+    value = os.getenv(f"{name.upper()}_{key}")
+    return cast(value) if value is not None else default
+
+
+def _build_client(name: str, settings: dict) -> httpx.AsyncClient:
+    """根据配置为单个上游服务创建长连接池"""
+    base_url = _env(name, "URL", settings["base_url"])
+    timeout = _env(name, "TIMEOUT", settings.get("timeout", 10.0), float)
+    connect_timeout = _env(name, "CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT, float)
+    limits = httpx.Limits(
+        max_connections=_env(name, "MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS, int),
+        max_keepalive_connections=_env(name, "MAX_KEEPALIVE", DEFAULT_MAX_KEEPALIVE, int),
+        keepalive_expiry=_env(name, "KEEPALIVE_EXPIRY", DEFAULT_KEEPALIVE_EXPIRY, float),
+    )
+    return httpx.AsyncClient(
+        base_url=base_url,
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        limits=limits,
+        http2=HTTP2_AVAILABLE,
+        follow_redirects=True,
+        # 已验证的用户身份随每个上游请求转发
+        event_hooks={"request": [forward_identity]},
+    )
+
+
+class UpstreamClients:
+    """网关共享的上游连接池，启动时创建，关闭时统一释放"""
+
+    def __init__(self):
+        self._clients = {}
+
+    async def start(self):
+        for name, settings in UPSTREAMS.items():
+            self._clients[name] = _build_client(name, settings)
+        logger.info(f"Upstream pools ready: {list(self._clients)} (http2={HTTP2_AVAILABLE})")
+
+    async def close(self):
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        client = self._clients.get(name)
+        if client is None:
+            raise RuntimeError(f"Upstream client '{name}' is not started")
+        return client
+
+
+upstreams = UpstreamClients()
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    return upstreams.get(name)
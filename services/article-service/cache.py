@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_SIZE = int(os.getenv("ARTICLE_CACHE_SIZE", "1024"))
+CACHE_TTL = float(os.getenv("ARTICLE_CACHE_TTL", "60"))
+CACHE_REDIS_URL = os.getenv("ARTICLE_CACHE_REDIS_URL")
+
+# 全站列表使用的 scope；标签列表的 scope 带 "tag:" 前缀（见 tag_scope），不会与之冲突
+ALL_ARTICLES = "all"
+
+
+def tag_scope(tag_name: str) -> str:
+    return f"tag:{tag_name}"
+
+_MISSING = object()
+
+
+class LRUCache:
+    """进程内 LRU 缓存，每个条目带过期时间"""
+
+    def __init__(self, maxsize: int, ttl: float, on_evict: Optional[Callable[[str], None]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self.delete(key)
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            evicted, _ = self._data.popitem(last=False)
+            if self.on_evict:
+                self.on_evict(evicted)
+
+    def delete(self, key: str):
+        if self._data.pop(key, None) is not None and self.on_evict:
+            self.on_evict(key)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisBackend:
+    """可选的共享缓存后端，多个 worker 之间共享条目"""
+
+    def __init__(self, url: str, ttl: float, prefix: str = "article-cache:"):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str):
+        raw = await self._redis.get(self.prefix + key)
+        return _MISSING if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any):
+        await self._redis.set(self.prefix + key, json.dumps(value), ex=max(int(self.ttl), 1))
+
+    async def delete(self, keys: Iterable[str]):
+        keys = [self.prefix + key for key in keys]
+        if keys:
+            await self._redis.delete(*keys)
+
+
+class ArticleCache:
+    """文章读缓存：本地 LRU + 可选共享后端，写操作按文章和标签精确失效
+
+    反向索引只记录本进程写入的键，其他 worker 写入共享后端的条目依靠 TTL 过期。
+    读请求在查库前取 generation()，写缓存时若相关文章或 scope 在此之后失效过则放弃写入，
+    避免写操作之前开始的读请求把旧数据写回缓存；读自副本时，失效后 replica_lag 秒内同样放弃写入。
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE, ttl: float = CACHE_TTL, backend=None):
+        self.local = LRUCache(maxsize, ttl, on_evict=self._forget)
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.backend_hits = 0
+        self.invalidations = 0
+        # 反向索引：文章 -> 含该文章的缓存键；scope -> 列表缓存键
+        self._keys_by_article: Dict[int, Set[str]] = {}
+        self._keys_by_scope: Dict[str, Set[str]] = {}
+        self._first_pages: Dict[str, Set[str]] = {}
+        self._key_meta: Dict[str, Tuple[Optional[str], Tuple[int, ...]]] = {}
+        # 失效序号：每次失效递增，并记录各文章 / scope 最近一次失效时的 (序号, 时间)，
+        # 最多保留 maxsize 个；淘汰掉的按最近淘汰的标记保守判断
+        self._seq = 0
+        self._marks_size = maxsize
+        self._article_seq: "OrderedDict[int, Tuple[int, float]]" = OrderedDict()
+        self._scope_seq: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._evicted_mark: Optional[Tuple[int, float]] = None
+        self.stale_skips = 0
+
+    @staticmethod
+    def article_key(article_id, fields: Tuple[str, ...]) -> str:
+        return f"article:{article_id}:{','.join(fields)}"
+
+    @staticmethod
+    def list_key(scope: str, cursor: Optional[str], limit: int, fields: Tuple[str, ...]) -> str:
+        return f"list:{scope}:{cursor or ''}:{limit}:{','.join(fields)}"
+
+    async def get(self, key: str):
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        if self.backend is not None:
+            try:
+                value = await self.backend.get(key)
+            except Exception as e:
+                logger.warning(f"Shared cache get failed: {e}")
+                value = _MISSING
+            if value is not _MISSING:
+                self.hits += 1
+                self.backend_hits += 1
+                self.local.set(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def generation(self) -> int:
+        """查库之前调用，结果传给 set_article / set_list"""
+        return self._seq
+
+    async def set_article(self, article_id: int, key: str, value: Any, generation: int, replica_lag: float = 0.0):
+        await self._store(key, value, None, (int(article_id),), False, generation, replica_lag)
+
+    async def set_list(self, scope: str, cursor: Optional[str], key: str, value: Any, article_ids: Iterable[int],
+                       generation: int, replica_lag: float = 0.0):
+        article_ids = tuple(int(i) for i in article_ids)
+        await self._store(key, value, scope, article_ids, cursor is None, generation, replica_lag)
+
+    async def invalidate_created(self, tags: Iterable[str]):
+        """新文章最新，只会出现在全站和各标签的首页"""
+        scopes = [ALL_ARTICLES] + [tag_scope(tag) for tag in tags]
+        self._bump(scopes=scopes)
+        keys = set()
+        for scope in scopes:
+            keys |= self._first_pages.get(scope, set())
+        await self._invalidate(keys)
+
+    async def invalidate_article(self, article_id: int, added_tags: Iterable[str] = ()):
+        """失效包含该文章的所有条目；新加入的标签列表位置未知，整体失效"""
+        scopes = [tag_scope(tag) for tag in added_tags]
+        self._bump(article_ids=[int(article_id)], scopes=scopes)
+        keys = set(self._keys_by_article.get(int(article_id), ()))
+        for scope in scopes:
+            keys |= self._keys_by_scope.get(scope, set())
+        await self._invalidate(keys)
+
+    def _bump(self, article_ids: Iterable[int] = (), scopes: Iterable[str] = ()):
+        self._seq += 1
+        mark = (self._seq, time.monotonic())
+        for marks, names in ((self._article_seq, article_ids), (self._scope_seq, scopes)):
+            for name in names:
+                marks[name] = mark
+                marks.move_to_end(name)
+            while len(marks) > self._marks_size:
+                _, evicted = marks.popitem(last=False)
+                self._evicted_mark = max(evicted, self._evicted_mark or evicted)
+
+    def _is_stale(self, scope, article_ids, generation: int, replica_lag: float) -> bool:
+        marks = [self._article_seq.get(article_id, self._evicted_mark) for article_id in article_ids]
+        if scope is not None:
+            marks.append(self._scope_seq.get(scope, self._evicted_mark))
+        lagging_since = time.monotonic() - replica_lag
+        return any(
+            mark is not None and (mark[0] > generation or (replica_lag > 0 and mark[1] > lagging_since))
+            for mark in marks
+        )
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "backend_hits": self.backend_hits,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidations,
+            "stale_skips": self.stale_skips,
+            "entries": len(self.local),
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+        }
+
+    async def _store(self, key, value, scope, article_ids, first_page, generation, replica_lag):
+        if self._is_stale(scope, article_ids, generation, replica_lag):
+            self.stale_skips += 1
+            return
+        self._forget(key)
+        self.local.set(key, value)
+        self._key_meta[key] = (scope, article_ids)
+        for article_id in article_ids:
+            self._keys_by_article.setdefault(article_id, set()).add(key)
+        if scope is not None:
+            self._keys_by_scope.setdefault(scope, set()).add(key)
+            if first_page:
+                self._first_pages.setdefault(scope, set()).add(key)
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, value)
+            except Exception as e:
+                logger.warning(f"Shared cache set failed: {e}")
+
+    async def _invalidate(self, keys: Set[str]):
+        if not keys:
+            return
+        self.invalidations += len(keys)
+        for key in keys:
+            self.local.delete(key)
+            self._forget(key)
+        if self.backend is not None:
+            try:
+                await self.backend.delete(keys)
+            except Exception as e:
+                logger.warning(f"Shared cache delete failed: {e}")
+
+    def _forget(self, key: str):
+        meta = self._key_meta.pop(key, None)
+        if meta is None:
+            return
+        scope, article_ids = meta
+        for article_id in article_ids:
+            keys = self._keys_by_article.get(article_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_article[article_id]
+        if scope is not None:
+            for index in (self._keys_by_scope, self._first_pages):
+                keys = index.get(scope)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del index[scope]
+
+
+def create_article_cache() -> ArticleCache:
+    backend = None
+    if CACHE_REDIS_URL:
+        try:
+            backend = RedisBackend(CACHE_REDIS_URL, CACHE_TTL)
+        except ImportError:
+            logger.warning("ARTICLE_CACHE_REDIS_URL is set but redis is not installed, using local cache only")
+    return ArticleCache(backend=backend)
+
+
+article_cache = create_article_cache()
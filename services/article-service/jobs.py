@@ -0,0 +1,33 @@
+from typing import Iterable
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import AIJob
+
+# 任务类型，与 ai-service 的工作协程约定
+SUMMARY = "summary"
+EMBEDDING = "embedding"
+
+
+def _upsert(db: AsyncSession, rows):
+    """已有同一对象的任务时重置为待处理并递增版本，避免重复排队"""
+    reset = {
+        "status": "pending",
+        "attempts": 0,
+        "run_at": func.now(),
+        "locked_at": None,
+        "last_error": None,
+        "version": AIJob.version + 1,
+    }
+    if db.get_bind().dialect.name == "sqlite":
+        stmt = sqlite_insert(AIJob).values(rows)
+        return stmt.on_conflict_do_update(index_elements=[AIJob.kind, AIJob.ref_id], set_=reset)
+    return mysql_insert(AIJob).values(rows).on_duplicate_key_update(**reset)
+
+
+async def enqueue(db: AsyncSession, kind: str, ref_ids: Iterable[int]):
+    """在当前事务中入队，随文章写入一起提交"""
+    rows = [{"kind": kind, "ref_id": ref_id, "status": "pending", "version": 1, "attempts": 0} for ref_id in ref_ids]
+    if rows:
+        await db.execute(_upsert(db, rows))
@@ -1,16 +1,28 @@
-from fastapi import FastAPI, HTTPException,APIRouter, Depends
+from fastapi import FastAPI, HTTPException,APIRouter, Depends, Query, Request
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from typing import List
+from typing import List, Dict, Optional, Tuple
 import uuid
 import socket
 import httpx
 import logging
-from database.database import init_db, get_db
+import asyncio
+from database.database import init_db, get_db, get_read_db, SessionLocal, ReadSessionLocal, pool_stats, replica_lag
+import counters
+import jobs
+from cache import ALL_ARTICLES, article_cache, tag_scope
+from etag import conditional_response
+from user_cache import user_cache
+from search import SEARCH_MAX_RESULTS, search_index
+from tags import load_article_tag_ids, normalize_tag_names, replace_article_tags, resolve_tag_ids, tag_id_cache
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, apply_keyset, split_page
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.models import Article as DBArticle
 from database.models import Tag as DBTag
 from database.models import User as DBUser
+from database.models import article_tags
 from sqlalchemy.future import select
+from sqlalchemy import func, update, delete
 from sqlalchemy.orm import joinedload   
 
 
@@ -32,6 +44,12 @@ class Article(BaseModel):
     author_id: str
     tags: List[str] = []
 
+class InvalidateUsers(BaseModel):
+    user_ids: List[int]
+
+class InvalidateArticles(BaseModel):
+    article_ids: List[int]
+
 class UpdateArticle(BaseModel):
     title: str
     content: str
@@ -40,9 +58,84 @@ class UpdateArticle(BaseModel):
 router = APIRouter(prefix="/articles", tags=["Articles"])
 
 
+EXCERPT_LENGTH = 200
+
+# 可投影的字段；tags 由批量查询单独填充，excerpt 由数据库截取正文前缀
+ARTICLE_FIELDS = ("id", "title", "content", "excerpt", "author_name", "author_id", "tags", "created_at", "comment_count")
+FULL_FIELDS = ("id", "title", "content", "author_name", "author_id", "tags", "created_at")
+SUMMARY_FIELDS = ("id", "title", "excerpt", "author_name", "author_id", "tags", "created_at", "comment_count")
+
+
+def parse_fields(fields: Optional[str], default: Tuple[str, ...]) -> Tuple[str, ...]:
+    """解析 fields=a,b,c 参数，未知字段返回 400"""
+    if not fields:
+        return default
+    requested = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in ARTICLE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested or default
+
+def _field_column(field: str):
+    if field == "excerpt":
+        return func.substr(DBArticle.content, 1, EXCERPT_LENGTH).label("excerpt")
+    if field == "author_name":
+        return DBUser.username.label("author_name")
+    return getattr(DBArticle, field)
+
+def article_query(fields: Tuple[str, ...] = FULL_FIELDS):
+    """只选择请求的列，不加载 ORM 对象；content 仅在显式请求时读取"""
+    # id 与 created_at 是分页键，始终需要
+    columns = [DBArticle.id, DBArticle.created_at]
+    columns += [_field_column(field) for field in fields if field not in ("id", "created_at", "tags", "comment_count")]
+    if "comment_count" in fields:
+        comment_count, counter, onclause = counters.counter_column(counters.ARTICLE_COMMENTS, DBArticle.id, "comment_count")
+        columns.append(comment_count)
+    query = select(*columns)
+    if "author_name" in fields:
+        query = query.outerjoin(DBUser, DBUser.id == DBArticle.author_id)
+    if "comment_count" in fields:
+        query = query.outerjoin(counter, onclause)
+    return query
+
+async def load_tag_names(db: AsyncSession, article_ids: List[int]) -> Dict[int, List[str]]:
+    """批量查询多篇文章的标签名，返回 {article_id: [tag_name, ...]}"""
+    tags_by_article = {article_id: [] for article_id in article_ids}
+    if not article_ids:
+        return tags_by_article
+    result = await db.execute(
+        select(article_tags.c.article_id, DBTag.name)
+        .join(DBTag, DBTag.id == article_tags.c.tag_id)
+        .where(article_tags.c.article_id.in_(article_ids))
+    )
+    for article_id, tag_name in result.all():
+        tags_by_article[article_id].append(tag_name)
+    return tags_by_article
+
+async def build_article_rows(db: AsyncSession, rows, fields: Tuple[str, ...] = FULL_FIELDS) -> List[dict]:
+    """将 article_query 的结果行直接组装为响应字典，标签只需额外一次查询"""
+    tags_by_article = {}
+    if "tags" in fields:
+        tags_by_article = await load_tag_names(db, [row["id"] for row in rows])
+    return [
+        {field: tags_by_article[row["id"]] if field == "tags" else row[field] for field in fields}
+        for row in rows
+    ]
+
+
+# 计数对账：以 article_tags 表的真实数据修复标签文章数
+COUNTER_JOBS = {
+    counters.TAG_ARTICLES: select(article_tags.c.tag_id, func.count()).group_by(article_tags.c.tag_id),
+}
+
+
 @app.on_event("startup")
 async def startup_event():
     await init_db()
+    if counters.RECONCILE_INTERVAL > 0:
+        asyncio.create_task(counters.reconcile_loop(SessionLocal, COUNTER_JOBS))
+    # 全文检索索引在后台从只读副本构建，构建完成前搜索接口返回 503
+    asyncio.create_task(search_index.rebuild_loop(ReadSessionLocal))
     ip = socket.gethostbyname(socket.gethostname())
     url = f"http://{CONSUL_HOST}:{CONSUL_PORT}/v1/agent/service/register"
     data = {
@@ -66,172 +159,251 @@ async def startup_event():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/db/pool")
+async def db_pool():
+    return pool_stats()
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {**article_cache.stats(), "user_cache": user_cache.stats()}
+
+@app.get("/search/stats")
+async def search_stats():
+    return search_index.stats()
+
+@app.post("/internal/users/invalidate")
+async def invalidate_users(payload: InvalidateUsers):
+    # 由 user-service 在用户变更后调用
+    user_cache.invalidate(payload.user_ids)
+    return {"invalidated": len(payload.user_ids)}
+
+@app.post("/internal/articles/invalidate")
+async def invalidate_articles(payload: InvalidateArticles):
+    # 由 comment-service 在评论数变化后调用
+    for article_id in payload.article_ids:
+        await article_cache.invalidate_article(article_id)
+    return {"invalidated": len(payload.article_ids)}
+
 
 """新建文章"""
 @router.post("/")
 async def create_article(article: Article, db: AsyncSession = Depends(get_db)):
+    try:
+        author_id = int(article.author_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid author_id")
     # 创建文章 ID
     new_article = DBArticle(
         title=article.title,
         content=article.content,
-        author_id=article.author_id
+        author_id=author_id
     )
     db.add(new_article)
 
-    author = await db.execute(select(DBUser.username).where(DBUser.id == article.author_id))
-    author_name = author.scalars().first()
-
-    # 显式加载 tags 关联数据
-    await db.refresh(new_article, attribute_names=["tags"])
+    author_name = await user_cache.get(db, author_id)
 
-    # 处理标签
-    for tag_name in article.tags:
-        result = await db.execute(select(DBTag).where(DBTag.name == tag_name))
-        tag = result.scalars().first()
-        if not tag:
-            tag = DBTag(name=tag_name)
-            db.add(tag)
-        new_article.tags.append(tag)
+    # 批量解析标签并写入关联
+    tag_names = normalize_tag_names(article.tags)
+    tag_ids = await resolve_tag_ids(db, tag_names)
+    await db.flush()
+    await replace_article_tags(db, new_article.id, set(tag_ids.values()), set())
+    await counters.bump(db, counters.TAG_ARTICLES, {tag_id: 1 for tag_id in tag_ids.values()})
+    # 摘要与相关文章向量由 ai-service 后台预先生成
+    await jobs.enqueue(db, jobs.SUMMARY, [new_article.id])
+    await jobs.enqueue(db, jobs.EMBEDDING, [new_article.id])
 
     await db.commit()
-    await db.refresh(new_article)
-    return {"author_id":new_article.author_id, "author_name": author_name, "title": new_article.title, "tags": [tag.name for tag in new_article.tags]}
+    tag_id_cache.remember(tag_ids)
+    await search_index.add(new_article.id, article.title, article.content)
+    await article_cache.invalidate_created(tag_names)
+    return {"author_id": int(new_article.author_id), "author_name": author_name, "title": new_article.title, "tags": tag_names}
 
 """获取所有文章"""
 @router.get("/")
-async def get_articles(db: AsyncSession = Depends(get_db)):
-    # 查询所有文章
-    result = await db.execute(select(DBArticle))
-    articles = result.scalars().all()
-
-    # 构造返回结果
-    response = []
-    for article in articles:
-        # 查询作者名称
-        author_result = await db.execute(select(DBUser.username).where(DBUser.id == article.author_id))
-        author_name = author_result.scalars().first()
-
-        # 查询文章的标签
-        tag_result = await db.execute(
-            select(DBTag)
-            .join(DBTag.articles)
-            .where(DBArticle.id == article.id)
-        )
-        tags = [tag.name for tag in tag_result.scalars().all()]
-
-        # 构造文章的响应数据
-        response.append({
-            "id": article.id,
-            "title": article.title,
-            "content": article.content,
-            "author_name": author_name,
-            "author_id": article.author_id,
-            "tags": tags
-        })
-
-    return response
+async def get_articles(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    # 列表默认返回摘要字段，不读取正文；一次查询文章及作者（键集分页），一次批量查询标签
+    fields = parse_fields(fields, SUMMARY_FIELDS)
+    cache_key = article_cache.list_key(ALL_ARTICLES, cursor, limit, fields)
+    cached = await article_cache.get(cache_key)
+    if cached is not None:
+        return conditional_response(request, cached)
+
+    generation = article_cache.generation()
+    query = apply_keyset(article_query(fields), DBArticle.created_at, DBArticle.id, cursor, limit)
+    result = await db.execute(query)
+    rows, next_cursor = split_page(result.mappings().all(), limit)
+    response = jsonable_encoder({"items": await build_article_rows(db, rows, fields), "next_cursor": next_cursor})
+    await article_cache.set_list(
+        ALL_ARTICLES, cursor, cache_key, response, [row["id"] for row in rows], generation, replica_lag(db)
+    )
+    return conditional_response(request, response)
+
+@router.get("/tags")
+async def get_tags(limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: AsyncSession = Depends(get_read_db)):
+    """标签及其文章数，按文章数倒序"""
+    article_count, counter, onclause = counters.counter_column(counters.TAG_ARTICLES, DBTag.id, "article_count")
+    result = await db.execute(
+        select(DBTag.name, article_count)
+        .outerjoin(counter, onclause)
+        .order_by(article_count.desc(), DBTag.name)
+        .limit(limit)
+    )
+    return [{"name": name, "article_count": count} for name, count in result.all()]
+
+@router.get("/search")
+async def search_articles(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """标题与正文全文检索，按 BM25 得分排序；cursor 为下一页的起始位置"""
+    if not search_index.ready:
+        raise HTTPException(status_code=503, detail="Search index is not ready")
+    try:
+        offset = int(cursor) if cursor else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    fields = parse_fields(fields, SUMMARY_FIELDS)
+    hits, total = search_index.search(q, offset, limit)
+    # 只按主键取当前页的文章，顺序以得分为准；索引与数据库短暂不一致时跳过已删除的文章
+    rows_by_id = {}
+    if hits:
+        result = await db.execute(article_query(fields).where(DBArticle.id.in_([article_id for article_id, _ in hits])))
+        rows_by_id = {row["id"]: row for row in result.mappings().all()}
+    rows = [rows_by_id[article_id] for article_id, _ in hits if article_id in rows_by_id]
+    items = await build_article_rows(db, rows, fields)
+    scores = dict(hits)
+    for row, item in zip(rows, items):
+        item["score"] = round(scores[row["id"]], 4)
+
+    next_offset = offset + limit
+    next_cursor = str(next_offset) if next_offset < min(total, SEARCH_MAX_RESULTS) else None
+    response = jsonable_encoder({"items": items, "total": total, "next_cursor": next_cursor})
+    return conditional_response(request, response)
 
 @router.get("/{article_id}")
-async def get_article(article_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(DBArticle).where(DBArticle.id == article_id))
-    article = result.scalars().first()
-    if not article:
-        raise HTTPException(status_code=404, detail="Article not found")    
-
-    response= []
-
-    author =await db.execute(select(DBUser.username).where(DBUser.id == article.author_id))
-    author_name = author.scalars().first()
-
-    tag_result = await db.execute(
-            select(DBTag)
-            .join(DBTag.articles)
-            .where(DBArticle.id == article.id)
-        )
-    tags = [tag.name for tag in tag_result.scalars().all()]
-
-    response.append({
-        "id": article.id,
-        "title": article.title,
-        "content": article.content,
-        "author_name": author_name,
-        "author_id": article.author_id,
-        "tags": tags
-    })
-    return response
+async def get_article(request: Request, article_id: str, fields: Optional[str] = None, db: AsyncSession = Depends(get_read_db)):
+    fields = parse_fields(fields, FULL_FIELDS)
+    cache_key = article_cache.article_key(article_id, fields)
+    cached = await article_cache.get(cache_key)
+    if cached is not None:
+        return conditional_response(request, cached)
+
+    generation = article_cache.generation()
+    result = await db.execute(article_query(fields).where(DBArticle.id == article_id))
+    rows = result.mappings().all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Article not found")
+    response = jsonable_encoder(await build_article_rows(db, rows, fields))
+    await article_cache.set_article(rows[0]["id"], cache_key, response, generation, replica_lag(db))
+    return conditional_response(request, response)
 
 
     
     
 @router.put("/{article_id}")
-async def update_article(article_id: str, article: UpdateArticle, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(DBArticle).where(DBArticle.id == article_id))
-    db_article = result.scalars().first()
-    if not db_article:
+async def update_article(article_id: int, article: UpdateArticle, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(DBArticle.id).where(DBArticle.id == article_id))
+    if result.scalar() is None:
         raise HTTPException(status_code=404, detail="Article not found")
 
     # 更新文章内容
-    db_article.title = article.title
-    db_article.content = article.content
-
-    # 显式加载 tags 关联数据
-    await db.refresh(db_article, attribute_names=["tags"])
-
-    # 更新标签
-    db_article.tags.clear()
-    for tag_name in article.tags:
-        result = await db.execute(select(DBTag).where(DBTag.name == tag_name))
-        tag = result.scalars().first()
-        if not tag:
-            tag = DBTag(name=tag_name)
-            db.add(tag)
-        db_article.tags.append(tag)
+    await db.execute(
+        update(DBArticle)
+        .where(DBArticle.id == article_id)
+        .values(title=article.title, content=article.content)
+    )
+
+    # 更新标签：批量解析后按差异增删关联
+    old_result = await db.execute(
+        select(DBTag.id, DBTag.name)
+        .join(article_tags, article_tags.c.tag_id == DBTag.id)
+        .where(article_tags.c.article_id == article_id)
+    )
+    old_tags = dict(old_result.all())
+    tag_names = normalize_tag_names(article.tags)
+    tag_ids = await resolve_tag_ids(db, tag_names)
+    new_tag_ids = set(tag_ids.values())
+    old_tag_ids = set(old_tags)
+    await replace_article_tags(db, article_id, new_tag_ids, old_tag_ids)
+
+    deltas = {tag_id: 1 for tag_id in new_tag_ids - old_tag_ids}
+    deltas.update({tag_id: -1 for tag_id in old_tag_ids - new_tag_ids})
+    await counters.bump(db, counters.TAG_ARTICLES, deltas)
+    # 正文可能变化，重新排队；内容未变时工作协程会直接跳过
+    await jobs.enqueue(db, jobs.SUMMARY, [article_id])
+    await jobs.enqueue(db, jobs.EMBEDDING, [article_id])
 
     await db.commit()
-    await db.refresh(db_article)
-    return {"id": db_article.id , "title": db_article.title, "tags": [tag.name for tag in db_article.tags]}
+    tag_id_cache.remember(tag_ids)
+    await search_index.add(article_id, article.title, article.content)
+    await article_cache.invalidate_article(article_id, added_tags=set(tag_names) - set(old_tags.values()))
+    return {"id": article_id, "title": article.title, "tags": tag_names}
 
 @router.delete("/{article_id}")
-async def delete_article(article_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(DBArticle).where(DBArticle.id == article_id))
-    db_article = result.scalars().first()
-    if not db_article:
+async def delete_article(article_id: int, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(DBArticle.id).where(DBArticle.id == article_id))
+    if result.scalar() is None:
         raise HTTPException(status_code=404, detail="Article not found")
 
-    await db.delete(db_article)
+    tag_ids = await load_article_tag_ids(db, article_id)
+    await replace_article_tags(db, article_id, set(), tag_ids)
+    await counters.bump(db, counters.TAG_ARTICLES, {tag_id: -1 for tag_id in tag_ids})
+    await counters.forget(db, counters.ARTICLE_COMMENTS, [article_id])
+    await db.execute(delete(DBArticle).where(DBArticle.id == article_id))
+    # 让 ai-service 把文章从内存向量矩阵中移除
+    await jobs.enqueue(db, jobs.EMBEDDING, [article_id])
     await db.commit()
+    search_index.remove(article_id)
+    await article_cache.invalidate_article(article_id)
     return {"message": "Article deleted successfully"}
 
 @router.get("/tag/{tag_name}")
-async def get_articles_by_tag(tag_name: str, db: AsyncSession = Depends(get_db)):
+async def get_articles_by_tag(
+    request: Request,
+    tag_name: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
     # 查询指定标签的文章
-    result = await db.execute(
-        select(DBArticle)
-        .join(DBArticle.tags)
+    fields = parse_fields(fields, SUMMARY_FIELDS)
+    scope = tag_scope(tag_name)
+    cache_key = article_cache.list_key(scope, cursor, limit, fields)
+    cached = await article_cache.get(cache_key)
+    if cached is not None:
+        return conditional_response(request, cached)
+
+    generation = article_cache.generation()
+    query = (
+        article_query(fields)
+        .join(article_tags, article_tags.c.article_id == DBArticle.id)
+        .join(DBTag, DBTag.id == article_tags.c.tag_id)
         .where(DBTag.name == tag_name)
     )
-    articles = result.scalars().all()
-
-    logger.info(f"Articles with tag '{tag_name}': {[article.title for article in articles]}")
-
-    # 构造返回结果
-    response = []
-    for article in articles:
-        # 查询作者名称
-        author_result = await db.execute(select(DBUser.username).where(DBUser.id == article.author_id))
-        author_name = author_result.scalars().first()
-
-        # 构造文章的响应数据
-        response.append({
-            "id": article.id,
-            "title": article.title,
-            "content": article.content,
-            "author_name": author_name,
-            "author_id": article.author_id,
-            "tags": [tag.name for tag in article.tags]
-        })
-
-    return response
+    result = await db.execute(apply_keyset(query, DBArticle.created_at, DBArticle.id, cursor, limit))
+    rows, next_cursor = split_page(result.mappings().all(), limit)
+    response = await build_article_rows(db, rows, fields)
+
+    logger.info(f"Articles with tag '{tag_name}': {[row['id'] for row in rows]}")
+    response = jsonable_encoder({"items": response, "next_cursor": next_cursor})
+    await article_cache.set_list(
+        scope, cursor, cache_key, response, [row["id"] for row in rows], generation, replica_lag(db)
+    )
+    return conditional_response(request, response)
 
 
 app.include_router(router)
\ No newline at end of file
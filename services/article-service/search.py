@@ -0,0 +1,221 @@
+import os
+import re
+import math
+import time
+import heapq
+import asyncio
+import logging
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.future import select
+from database.database import DB_REPLICA_LAG_SECONDS
+from database.models import Article as DBArticle
+
+try:
+    import jieba
+except ImportError:
+    jieba = None
+
+logger = logging.getLogger(__name__)
+
+# 定期全量重建，兜底其他实例写入或增量更新遗漏；0 表示只在启动时构建
+SEARCH_REBUILD_INTERVAL = float(os.getenv("SEARCH_REBUILD_INTERVAL", "600"))
+# 标题中的词按该倍数计入词频
+SEARCH_TITLE_WEIGHT = int(os.getenv("SEARCH_TITLE_WEIGHT", "3"))
+# 排序只保留前 N 条，限制深分页的开销
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "1000"))
+BM25_K1 = float(os.getenv("SEARCH_BM25_K1", "1.2"))
+BM25_B = float(os.getenv("SEARCH_BM25_B", "0.75"))
+
+# 连续的汉字 / 连续的字母数字
+_CJK_RUN = re.compile(r"[㐀-䶿一-鿿豈-﫿]+")
+_WORD = re.compile(r"[㐀-䶿一-鿿豈-﫿]+|[^\W_]+")
+
+
+def _bigrams(run: str) -> List[str]:
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def _unigrams(text: str, tokens: List[str]) -> List[str]:
+    """汉字逐字计入，分词结果中已有的单字不重复计入"""
+    chars = Counter(char for run in _CJK_RUN.findall(text) for char in run)
+    return list((chars - Counter(token for token in tokens if len(token) == 1)).elements())
+
+
+def tokenize(text: str, unigrams: bool = False) -> List[str]:
+    """中文优先用 jieba 搜索引擎模式分词；未安装时汉字按相邻二元组切分，其余按单词切分。
+
+    建索引时 unigrams 为 True，额外计入单个汉字，单字查询（如“猫”）也能命中含该字的词。
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    if jieba is not None:
+        tokens = [token for token in jieba.lcut_for_search(text) if _WORD.fullmatch(token)]
+    else:
+        tokens = []
+        for match in _WORD.finditer(text):
+            word = match.group()
+            tokens.extend(_bigrams(word) if _CJK_RUN.fullmatch(word) else [word])
+    if unigrams:
+        tokens.extend(_unigrams(text, tokens))
+    return tokens
+
+
+def document_terms(title: str, content: str) -> Counter:
+    terms = Counter(tokenize(content, unigrams=True))
+    for token in tokenize(title, unigrams=True):
+        terms[token] += SEARCH_TITLE_WEIGHT
+    return terms
+
+
+class SearchIndex:
+    """进程内倒排索引，按 BM25 排序；写文章后增量更新，后台定期全量重建"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_terms: Dict[int, Counter] = {}
+        self.doc_len: Dict[int, int] = {}
+        self.total_len = 0
+        self.ready = False
+        # 重建期间的写入，重建完成后重放（None 表示删除）
+        self._pending: Optional[Dict[int, Optional[Counter]]] = None
+        # 重建从副本读取，开始前复制延迟窗口内的写入可能还没同步过去，同样重放
+        self._recent: "OrderedDict[int, Tuple[float, Optional[Counter]]]" = OrderedDict()
+        # 分词在线程中进行，同一篇文章先后两次写入可能乱序完成，只应用最后一次写入的结果
+        self._write_seq = 0
+        self._latest: Dict[int, int] = {}
+        self.built_at = None
+        self.build_ms = 0.0
+        self.queries = 0
+        self.total_query_ms = 0.0
+        self.max_query_ms = 0.0
+
+    def _add_terms(self, article_id: int, terms: Counter):
+        self.doc_terms[article_id] = terms
+        length = sum(terms.values())
+        self.doc_len[article_id] = length
+        self.total_len += length
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[article_id] = tf
+
+    def _remove(self, article_id: int):
+        terms = self.doc_terms.pop(article_id, None)
+        if terms is None:
+            return
+        self.total_len -= self.doc_len.pop(article_id)
+        for term in terms:
+            docs = self.postings[term]
+            del docs[article_id]
+            if not docs:
+                del self.postings[term]
+
+    def _record(self, article_id: int, terms: Optional[Counter]):
+        if self._pending is not None:
+            self._pending[article_id] = terms
+        now = time.monotonic()
+        self._recent[article_id] = (now, terms)
+        self._recent.move_to_end(article_id)
+        while self._recent and next(iter(self._recent.values()))[0] < now - DB_REPLICA_LAG_SECONDS:
+            self._recent.popitem(last=False)
+
+    def _next_seq(self, article_id: int) -> int:
+        self._write_seq += 1
+        self._latest[article_id] = self._write_seq
+        return self._write_seq
+
+    async def add(self, article_id: int, title: str, content: str):
+        """新建或更新文章后调用（事务提交之后），分词放到线程中避免阻塞事件循环"""
+        seq = self._next_seq(article_id)
+        terms = await asyncio.to_thread(document_terms, title, content)
+        if self._latest.get(article_id) != seq:
+            return
+        del self._latest[article_id]
+        # 以下不含 await，相对 search / rebuild 的替换是原子的
+        self._record(article_id, terms)
+        self._remove(article_id)
+        self._add_terms(article_id, terms)
+
+    def remove(self, article_id: int):
+        self._latest.pop(article_id, None)
+        self._record(article_id, None)
+        self._remove(article_id)
+
+    def search(self, query: str, offset: int, limit: int) -> Tuple[List[Tuple[int, float]], int]:
+        """返回 (当前页的 [(article_id, score)], 命中总数)"""
+        started = time.perf_counter()
+        scores: Dict[int, float] = {}
+        n = len(self.doc_len)
+        avgdl = self.total_len / n if n else 0.0
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for article_id, tf in docs.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[article_id] / avgdl)
+                scores[article_id] = scores.get(article_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        top = heapq.nlargest(min(offset + limit, SEARCH_MAX_RESULTS), scores.items(), key=lambda item: (item[1], item[0]))
+        elapsed = (time.perf_counter() - started) * 1000
+        self.queries += 1
+        self.total_query_ms += elapsed
+        self.max_query_ms = max(self.max_query_ms, elapsed)
+        return top[offset:offset + limit], len(scores)
+
+    async def rebuild(self, session_factory):
+        """读取全部文章，在线程中分词构建新索引后整体替换"""
+        started = time.perf_counter()
+        lagging_since = time.monotonic() - DB_REPLICA_LAG_SECONDS
+        self._pending = {}
+        try:
+            async with session_factory() as db:
+                result = await db.execute(select(DBArticle.id, DBArticle.title, DBArticle.content))
+                rows = result.all()
+            terms = await asyncio.to_thread(lambda: [(row.id, document_terms(row.title, row.content)) for row in rows])
+
+            fresh = SearchIndex()
+            for article_id, doc_terms in terms:
+                fresh._add_terms(article_id, doc_terms)
+            replay = {article_id: terms for article_id, (at, terms) in self._recent.items() if at >= lagging_since}
+            replay.update(self._pending)
+            for article_id, doc_terms in replay.items():
+                fresh._remove(article_id)
+                if doc_terms is not None:
+                    fresh._add_terms(article_id, doc_terms)
+            self.postings, self.doc_terms, self.doc_len, self.total_len = (
+                fresh.postings, fresh.doc_terms, fresh.doc_len, fresh.total_len
+            )
+        finally:
+            self._pending = None
+        self.ready = True
+        self.built_at = time.time()
+        self.build_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Search index rebuilt: {len(self.doc_len)} articles, {len(self.postings)} terms, {self.build_ms:.0f} ms")
+
+    async def rebuild_loop(self, session_factory, interval: float = SEARCH_REBUILD_INTERVAL):
+        while True:
+            try:
+                await self.rebuild(session_factory)
+            except Exception as e:
+                logger.error(f"Search index rebuild failed: {e}")
+            if interval <= 0 and self.ready:
+                return
+            await asyncio.sleep(interval if interval > 0 else 5)
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "tokenizer": "jieba" if jieba is not None else "bigram",
+            "articles": len(self.doc_len),
+            "terms": len(self.postings),
+            "built_at": self.built_at,
+            "build_ms": round(self.build_ms, 1),
+            "queries": self.queries,
+            "avg_query_ms": round(self.total_query_ms / self.queries, 3) if self.queries else 0.0,
+            "max_query_ms": round(self.max_query_ms, 3),
+        }
+
+
+search_index = SearchIndex()
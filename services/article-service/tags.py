@@ -0,0 +1,89 @@
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Set
+from sqlalchemy import delete, insert
+from sqlalchemy.future import select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import Tag as DBTag
+from database.models import article_tags
+
+TAG_CACHE_SIZE = int(os.getenv("TAG_CACHE_SIZE", "10000"))
+
+
+class TagIdCache:
+    """进程内标签名 -> id 缓存，只记录已提交的标签"""
+
+    def __init__(self, maxsize: int = TAG_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._ids: "OrderedDict[str, int]" = OrderedDict()
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, int]:
+        found = {}
+        for name in names:
+            tag_id = self._ids.get(name)
+            if tag_id is not None:
+                self._ids.move_to_end(name)
+                found[name] = tag_id
+        return found
+
+    def remember(self, ids: Dict[str, int]):
+        for name, tag_id in ids.items():
+            self._ids[name] = tag_id
+            self._ids.move_to_end(name)
+        while len(self._ids) > self.maxsize:
+            self._ids.popitem(last=False)
+
+
+tag_id_cache = TagIdCache()
+
+
+def normalize_tag_names(names: Iterable[str]) -> List[str]:
+    """去除空白与重复，保持原有顺序"""
+    return list(dict.fromkeys(name.strip() for name in names if name and name.strip()))
+
+
+def _insert_missing(db: AsyncSession, names: List[str]):
+    rows = [{"name": name} for name in names]
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite_insert(DBTag).values(rows).on_conflict_do_nothing(index_elements=[DBTag.name])
+    stmt = mysql_insert(DBTag).values(rows)
+    # 并发写入同名标签时由唯一约束兜底，不再报错
+    return stmt.on_duplicate_key_update(name=stmt.inserted.name)
+
+
+async def resolve_tag_ids(db: AsyncSession, names: List[str]) -> Dict[str, int]:
+    """批量解析标签 id：缓存 -> 一次 IN 查询 -> 一次多行 upsert 补齐缺失标签"""
+    ids = tag_id_cache.get_many(names)
+    missing = [name for name in names if name not in ids]
+    if missing:
+        result = await db.execute(select(DBTag.name, DBTag.id).where(DBTag.name.in_(missing)))
+        ids.update(dict(result.all()))
+        missing = [name for name in missing if name not in ids]
+    if missing:
+        await db.execute(_insert_missing(db, missing))
+        # 加锁读，确保能看到并发事务刚提交的同名标签
+        result = await db.execute(
+            select(DBTag.name, DBTag.id).where(DBTag.name.in_(missing)).with_for_update(read=True)
+        )
+        ids.update(dict(result.all()))
+    return {name: ids[name] for name in names}
+
+
+async def load_article_tag_ids(db: AsyncSession, article_id: int) -> Set[int]:
+    result = await db.execute(select(article_tags.c.tag_id).where(article_tags.c.article_id == article_id))
+    return set(result.scalars().all())
+
+
+async def replace_article_tags(db: AsyncSession, article_id: int, new_ids: Set[int], old_ids: Set[int]):
+    """按差异更新 article_tags：只删除移除的标签、只插入新增的标签"""
+    removed = old_ids - new_ids
+    added = new_ids - old_ids
+    if removed:
+        await db.execute(
+            delete(article_tags)
+            .where(article_tags.c.article_id == article_id, article_tags.c.tag_id.in_(removed))
+        )
+    if added:
+        await db.execute(insert(article_tags), [{"article_id": article_id, "tag_id": tag_id} for tag_id in added])
@@ -0,0 +1,122 @@
+import os
+import asyncio
+import logging
+from typing import Dict, Iterable
+from sqlalchemy import delete, func, literal
+from sqlalchemy.future import select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import Counter
+
+logger = logging.getLogger(__name__)
+
+ARTICLE_COMMENTS = "article_comments"
+COMMENT_REPLIES = "comment_replies"
+TAG_ARTICLES = "tag_articles"
+
+RECONCILE_INTERVAL = float(os.getenv("COUNTER_RECONCILE_INTERVAL", "3600"))
+
+
+def _upsert(db: AsyncSession, rows, increment: bool):
+    """多行 upsert；increment 为 True 时在原值上累加，否则直接覆盖"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        stmt = sqlite_insert(Counter).values(rows)
+        new_value = stmt.excluded.value
+        value = Counter.value + new_value if increment else new_value
+        return stmt.on_conflict_do_update(index_elements=[Counter.scope, Counter.ref_id], set_={"value": value})
+    stmt = mysql_insert(Counter).values(rows)
+    new_value = stmt.inserted.value
+    return stmt.on_duplicate_key_update(value=Counter.value + new_value if increment else new_value)
+
+
+async def bump(db: AsyncSession, scope: str, deltas: Dict[int, int]):
+    """在当前事务中按增量更新计数，一条语句完成"""
+    rows = [{"scope": scope, "ref_id": ref_id, "value": delta} for ref_id, delta in deltas.items() if delta]
+    if rows:
+        await db.execute(_upsert(db, rows, increment=True))
+
+
+async def forget(db: AsyncSession, scope: str, ref_ids: Iterable[int]):
+    """删除已不存在对象的计数行"""
+    ref_ids = list(ref_ids)
+    if ref_ids:
+        await db.execute(delete(Counter).where(Counter.scope == scope, Counter.ref_id.in_(ref_ids)))
+
+
+async def get_counts(db: AsyncSession, scope: str, ref_ids: Iterable[int]) -> Dict[int, int]:
+    ref_ids = list(ref_ids)
+    counts = {ref_id: 0 for ref_id in ref_ids}
+    if ref_ids:
+        result = await db.execute(
+            select(Counter.ref_id, Counter.value).where(Counter.scope == scope, Counter.ref_id.in_(ref_ids))
+        )
+        counts.update(dict(result.all()))
+    return counts
+
+
+def counter_column(scope: str, ref_column, label: str):
+    """返回 (计数列, 关联条件)，用于在列表查询中 LEFT JOIN 计数"""
+    counter = Counter.__table__.alias(f"{label}_counter")
+    onclause = (counter.c.scope == scope) & (counter.c.ref_id == ref_column)
+    return func.coalesce(counter.c.value, 0).label(label), counter, onclause
+
+
+def _recount(db: AsyncSession, scope: str, source_query, ref_ids):
+    """INSERT … SELECT：在同一条语句里重新计数并覆盖，并发的 bump 要么先提交被计入，要么等待本语句结束后再累加"""
+    ref_column = source_query.selected_columns[0]
+    fresh = source_query.where(ref_column.in_(ref_ids)).subquery("fresh")
+    ref_id, count = fresh.c
+    # SQLite 解析 INSERT … SELECT … ON CONFLICT 时要求 SELECT 带 WHERE
+    rows = select(literal(scope), ref_id, count).where(ref_id.is_not(None))
+    columns = ["scope", "ref_id", "value"]
+    if db.get_bind().dialect.name == "sqlite":
+        stmt = sqlite_insert(Counter).from_select(columns, rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[Counter.scope, Counter.ref_id], set_={"value": stmt.excluded.value}
+        )
+    stmt = mysql_insert(Counter).from_select(columns, rows)
+    return stmt.on_duplicate_key_update(value=stmt.inserted.value)
+
+
+async def reconcile(db: AsyncSession, scope: str, source_query) -> int:
+    """用真实计数修复漂移；source_query 返回 (ref_id, count)，返回修复的行数。
+
+    先读出的快照只用于找出漂移的行，写入时重新计数，不会用旧快照覆盖期间发生的增量。
+    """
+    actual = dict((await db.execute(source_query)).all())
+    stored = dict((await db.execute(select(Counter.ref_id, Counter.value).where(Counter.scope == scope))).all())
+
+    drifted = [ref_id for ref_id, count in actual.items() if stored.get(ref_id) != count]
+    # 真实计数为 0 的对象不再保留计数行；值已为 0 的行不算漂移
+    stale = [ref_id for ref_id in stored if ref_id not in actual]
+    if drifted:
+        await db.execute(_recount(db, scope, source_query, drifted))
+    if stale:
+        # 删除前再确认一次对象确实没有计数来源，期间新增的计数行保留
+        ref_column = source_query.selected_columns[0]
+        live = source_query.with_only_columns(ref_column).where(ref_column.in_(stale))
+        await db.execute(
+            delete(Counter).where(Counter.scope == scope, Counter.ref_id.in_(stale), Counter.ref_id.not_in(live))
+        )
+    await db.commit()
+    return len(drifted) + sum(1 for ref_id in stale if stored[ref_id] != 0)
+
+
+async def reconcile_all(session_factory, jobs: Dict[str, object]):
+    for scope, source_query in jobs.items():
+        try:
+            async with session_factory() as db:
+                repaired = await reconcile(db, scope, source_query)
+            if repaired:
+                logger.warning(f"Counter scope '{scope}' drifted, repaired {repaired} rows")
+        except Exception as e:
+            logger.error(f"Counter reconciliation for '{scope}' failed: {e}")
+
+
+async def reconcile_loop(session_factory, jobs: Dict[str, object], interval: float = RECONCILE_INTERVAL):
+    """后台对账任务，启动时先执行一次再定期执行，jobs 为 {scope: source_query}"""
+    while True:
+        await reconcile_all(session_factory, jobs)
+        await asyncio.sleep(interval)
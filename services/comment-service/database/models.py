@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, func, Table
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, func, Table, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -18,12 +18,19 @@ class User(Base):
 # 文章表
 class Article(Base):
     __tablename__ = "articles"
+    __table_args__ = (
+        # 文章列表按 (created_at, id) 键集分页
+        Index("ix_articles_created_at_id", "created_at", "id"),
+        # 按作者查文章，删除用户时的级联删除也走这个索引
+        Index("ix_articles_author_id_created_at", "author_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
     content = Column(Text, nullable=False)
     author_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    created_at = Column(DateTime, default=func.now())
+    # 键集分页的排序键，不允许为空
+    created_at = Column(DateTime, nullable=False, default=func.now(), server_default=func.current_timestamp())
 
     author = relationship("User", back_populates="articles")
     comments = relationship("Comment", back_populates="article")
@@ -32,13 +39,22 @@ class Article(Base):
 # 评论表
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # 平铺模式：article_id 等值过滤 + (created_at, id) 正序分页
+        Index("ix_comments_article_id_created_at", "article_id", "created_at", "id"),
+        # 树形模式的顶层评论（parent_id IS NULL）
+        Index("ix_comments_article_id_parent_id_created_at", "article_id", "parent_id", "created_at", "id"),
+        # 回复分页与递归 CTE 按 parent_id 查子评论
+        Index("ix_comments_parent_id_created_at", "parent_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    article_id = Column(Integer, ForeignKey("articles.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     content = Column(Text, nullable=False)
-    parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True)  # 父评论 ID
-    created_at = Column(DateTime, default=func.now())
+    parent_id = Column(Integer, ForeignKey("comments.id", ondelete="CASCADE"), nullable=True)  # 父评论 ID
+    # 键集分页的排序键，不允许为空
+    created_at = Column(DateTime, nullable=False, default=func.now(), server_default=func.current_timestamp())
 
     # 关系
     user = relationship("User", back_populates="comments")
@@ -60,4 +76,14 @@ article_tags = Table(
     Base.metadata,
     Column("article_id", Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True),
     Column("tag_id", Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    # 主键为 (article_id, tag_id)，按标签查文章需要反方向的索引
+    Index("ix_article_tags_tag_id_article_id", "tag_id", "article_id"),
 )
+
+# 冗余计数表：按 (scope, ref_id) 记录评论数、回复数、标签文章数，避免 COUNT(*) 扫描
+class Counter(Base):
+    __tablename__ = "counters"
+
+    scope = Column(String(32), primary_key=True)
+    ref_id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
@@ -1,16 +1,24 @@
-from fastapi import FastAPI, HTTPException,APIRouter, Depends
+from fastapi import FastAPI, HTTPException,APIRouter, Depends, Query, Request
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 import uuid
 import socket
 import httpx
 import logging
-from database.database import init_db, get_db
+import asyncio
+from database.database import init_db, get_db, get_read_db, SessionLocal, pool_stats
+import counters
+import notify
+from etag import conditional_response
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, apply_keyset, split_page
+from user_cache import user_cache
+from threads import DEFAULT_MAX_CHILDREN, DEFAULT_MAX_DEPTH, comment_dict, comment_query, load_threads, subtree_query
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.models import Article as DBArticle
 from database.models import Comment as DBComment
 from database.models import User as DBUser
 from sqlalchemy.future import select
+from sqlalchemy import update, delete, func
 from sqlalchemy.orm import joinedload   
 
 
@@ -32,13 +40,29 @@ class Comment(BaseModel):
     content: str
     parent_id: int = None
 
+class InvalidateUsers(BaseModel):
+    user_ids: List[int]
+
 
 router = APIRouter(prefix="/comments", tags=["Comments"])
 
 
+# 计数对账：以 comments 表的真实数据修复冗余计数
+COUNTER_JOBS = {
+    counters.ARTICLE_COMMENTS: select(DBComment.article_id, func.count()).group_by(DBComment.article_id),
+    counters.COMMENT_REPLIES: (
+        select(DBComment.parent_id, func.count())
+        .where(DBComment.parent_id.is_not(None))
+        .group_by(DBComment.parent_id)
+    ),
+}
+
+
 @app.on_event("startup")
 async def startup_event():
     await init_db()
+    if counters.RECONCILE_INTERVAL > 0:
+        asyncio.create_task(counters.reconcile_loop(SessionLocal, COUNTER_JOBS))
     ip = socket.gethostbyname(socket.gethostname())
     url = f"http://{CONSUL_HOST}:{CONSUL_PORT}/v1/agent/service/register"
     data = {
@@ -58,35 +82,68 @@ async def startup_event():
         except Exception as e:
             print(f"Failed to register with Consul: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await notify.close()
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/db/pool")
+async def db_pool():
+    return pool_stats()
+
+@app.post("/internal/users/invalidate")
+async def invalidate_users(payload: InvalidateUsers):
+    # 由 user-service 在用户变更后调用
+    user_cache.invalidate(payload.user_ids)
+    return {"invalidated": len(payload.user_ids)}
+
 @router.get("/article/{article_id}")
-async def get_comments_by_article(article_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(DBComment)
-        .where(DBComment.article_id == article_id)
+async def get_comments_by_article(
+    request: Request,
+    article_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    mode: str = Query("flat", pattern="^(flat|tree)$"),
+    max_depth: int = Query(DEFAULT_MAX_DEPTH, ge=0, le=20),
+    max_children: int = Query(DEFAULT_MAX_CHILDREN, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if mode == "tree":
+        # 树形模式：分页的是顶层评论，每个节点带回复子树
+        roots_query = (
+            select(DBComment.id, DBComment.created_at)
+            .where(DBComment.article_id == article_id, DBComment.parent_id.is_(None))
+        )
+        items, next_cursor = await load_threads(db, roots_query, cursor, limit, max_depth, max_children)
+        return conditional_response(request, {"items": items, "next_cursor": next_cursor})
+
+    # 评论按时间正序，键集分页，用户名随评论一次 JOIN 取回
+    query = apply_keyset(
+        comment_query().where(DBComment.article_id == article_id),
+        DBComment.created_at, DBComment.id, cursor, limit, descending=False,
     )
-    comments = result.scalars().all()
-
-    response = []
-
-    for comment in comments:
-        username_result = await db.execute(
-            select(DBUser.username).where(DBUser.id == comment.user_id)
-        )   
-        username = username_result.scalars().first()
-        response.append({
-            "id": comment.id,
-            "article_id": comment.article_id,
-            "user_id": comment.user_id,
-            "username": username,
-            "content": comment.content,
-            "parent_id": comment.parent_id,
-            "created_at": comment.created_at,
-        })
-    return response
+    result = await db.execute(query)
+    rows, next_cursor = split_page(result.mappings().all(), limit)
+    response = [comment_dict(row) for row in rows]
+    return conditional_response(request, {"items": response, "next_cursor": next_cursor})
+
+@router.get("/{comment_id}/replies")
+async def get_comment_replies(
+    request: Request,
+    comment_id: int,
+    limit: int = Query(DEFAULT_MAX_CHILDREN, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    max_depth: int = Query(DEFAULT_MAX_DEPTH, ge=0, le=20),
+    max_children: int = Query(DEFAULT_MAX_CHILDREN, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """加载某条评论的更多回复，cursor 取自节点的 replies_cursor"""
+    roots_query = select(DBComment.id, DBComment.created_at).where(DBComment.parent_id == comment_id)
+    items, next_cursor = await load_threads(db, roots_query, cursor, limit, max_depth, max_children)
+    return conditional_response(request, {"items": items, "next_cursor": next_cursor})
 
 
 @router.post("/")
@@ -96,15 +153,10 @@ async def add_comment(comment: Comment, db: AsyncSession = Depends(get_db)):
     if not article_result.scalars().first():
         raise HTTPException(status_code=404, detail="Article not found")
 
-    # 检查用户是否存在
-    user_result = await db.execute(select(DBUser).where(DBUser.id == comment.user_id))
-    if not user_result.scalars().first():
+    # 检查用户是否存在，同时取得用户名（走用户缓存）
+    username = await user_cache.get(db, comment.user_id)
+    if username is None:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    username_result = await db.execute(
-        select(DBUser.username).where(DBUser.id == comment.user_id)
-    )
-    username = username_result.scalars().first()
 
     # 创建评论
     new_comment = DBComment(
@@ -113,8 +165,11 @@ async def add_comment(comment: Comment, db: AsyncSession = Depends(get_db)):
         content=comment.content,
     )
     db.add(new_comment)
+    await counters.bump(db, counters.ARTICLE_COMMENTS, {comment.article_id: 1})
     await db.commit()
     await db.refresh(new_comment)
+    # 文章读缓存中带有评论数
+    notify.articles_changed([comment.article_id])
 
     return {
         "id": new_comment.id,
@@ -140,25 +195,38 @@ async def add_comment(comment: Comment, db: AsyncSession = Depends(get_db)):
 
 @router.delete("/{comment_id}")
 async def delete_comment(comment_id: int, db: AsyncSession = Depends(get_db)):
-    # 查询要删除的评论
-    result = await db.execute(select(DBComment).where(DBComment.id == comment_id))
-    comment = result.scalars().first()
-    if not comment:
+    result = await db.execute(
+        select(DBComment.article_id, DBComment.parent_id).where(DBComment.id == comment_id)
+    )
+    root = result.first()
+    if not root:
         raise HTTPException(status_code=404, detail="Comment not found")
 
-    # 查询并删除所有子评论（递归删除）
-    async def delete_replies(parent_id: int):
-        replies_result = await db.execute(select(DBComment).where(DBComment.parent_id == parent_id))
-        replies = replies_result.scalars().all()
-        for reply in replies:
-            await delete_replies(reply.id)  # 递归删除子评论
-            await db.delete(reply)
-
-    await delete_replies(comment_id)
+    # 一条递归 CTE 查询出要删除的整棵子树
+    subtree = subtree_query([comment_id])
+    result = await db.execute(select(subtree.c.id))
+    comment_ids = result.scalars().all()
+
+    # 先断开子树内的父子引用（自引用外键按行检查），再一次性删除
+    await db.execute(
+        update(DBComment)
+        .where(DBComment.id.in_(comment_ids))
+        .values(parent_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(DBComment)
+        .where(DBComment.id.in_(comment_ids))
+        .execution_options(synchronize_session=False)
+    )
 
-    # 删除主评论
-    await db.delete(comment)
+    # 同一事务内更新计数
+    await counters.bump(db, counters.ARTICLE_COMMENTS, {root.article_id: -len(comment_ids)})
+    if root.parent_id is not None:
+        await counters.bump(db, counters.COMMENT_REPLIES, {root.parent_id: -1})
+    await counters.forget(db, counters.COMMENT_REPLIES, comment_ids)
     await db.commit()
+    notify.articles_changed([root.article_id])
 
     return {"detail": "Comment and its replies deleted successfully"}
 
@@ -175,15 +243,10 @@ async def reply_to_comment(comment: Comment, db: AsyncSession = Depends(get_db))
     if not article_result.scalars().first():
         raise HTTPException(status_code=404, detail="Article not found")
 
-    # 检查用户是否存在
-    user_result = await db.execute(select(DBUser).where(DBUser.id == comment.user_id))
-    if not user_result.scalars().first():
+    # 检查用户是否存在，同时取得用户名（走用户缓存）
+    username = await user_cache.get(db, comment.user_id)
+    if username is None:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    username_result = await db.execute(
-        select(DBUser.username).where(DBUser.id == comment.user_id)
-    )
-    username = username_result.scalars().first()
 
     # 创建回复
     new_comment = DBComment(
@@ -193,8 +256,11 @@ async def reply_to_comment(comment: Comment, db: AsyncSession = Depends(get_db))
         parent_id=comment.parent_id,
     )
     db.add(new_comment)
+    await counters.bump(db, counters.ARTICLE_COMMENTS, {comment.article_id: 1})
+    await counters.bump(db, counters.COMMENT_REPLIES, {comment.parent_id: 1})
     await db.commit()
     await db.refresh(new_comment)
+    notify.articles_changed([comment.article_id])
 
     return {
         "id": new_comment.id,
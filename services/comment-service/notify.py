@@ -0,0 +1,37 @@
+import os
+import asyncio
+import logging
+from typing import List
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 持有文章读缓存的服务，评论数变化后通知它们失效
+ARTICLE_CACHE_SUBSCRIBERS = [
+    url for url in os.getenv("ARTICLE_CACHE_SUBSCRIBERS", "http://article_service:8002").split(",") if url
+]
+
+_client = httpx.AsyncClient(timeout=2.0)
+_pending = set()
+
+
+async def _notify(article_ids: List[int]):
+    async def post(base_url):
+        try:
+            await _client.post(f"{base_url}/internal/articles/invalidate", json={"article_ids": article_ids})
+        except Exception as e:
+            # 通知失败时对方的缓存会在 TTL 到期后自然刷新
+            logger.warning(f"Failed to invalidate article cache at {base_url}: {e}")
+
+    await asyncio.gather(*(post(url) for url in ARTICLE_CACHE_SUBSCRIBERS))
+
+
+def articles_changed(article_ids: List[int]):
+    """后台发送失效通知，不阻塞当前请求"""
+    task = asyncio.create_task(_notify(article_ids))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def close():
+    await _client.aclose()
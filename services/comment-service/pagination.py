@@ -0,0 +1,49 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """将 (created_at, id) 编码为不透明游标"""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析游标，格式非法时返回 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def apply_keyset(query, created_col, id_col, cursor: Optional[str], limit: int, descending: bool = True):
+    """按 (created_at, id) 做键集分页，多取一行用于判断是否还有下一页"""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if descending:
+            query = query.where(or_(created_col < created_at, and_(created_col == created_at, id_col < row_id)))
+        else:
+            query = query.where(or_(created_col > created_at, and_(created_col == created_at, id_col > row_id)))
+    if descending:
+        query = query.order_by(created_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(created_col.asc(), id_col.asc())
+    return query.limit(limit + 1)
+
+
+def split_page(rows: List, limit: int) -> Tuple[List, Optional[str]]:
+    """截取当前页并生成下一页游标，rows 需包含 created_at 与 id"""
+    if len(rows) <= limit:
+        return list(rows), None
+    rows = list(rows[:limit])
+    last = rows[-1]
+    return rows, encode_cursor(last["created_at"], last["id"])
@@ -0,0 +1,133 @@
+from collections import defaultdict
+from typing import Dict, List, Optional
+from sqlalchemy import func, literal
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import Comment as DBComment
+from database.models import User as DBUser
+from counters import COMMENT_REPLIES, counter_column
+from pagination import apply_keyset, encode_cursor, split_page
+
+DEFAULT_MAX_DEPTH = 3
+DEFAULT_MAX_CHILDREN = 10
+
+
+def comment_query():
+    """评论字段、用户名与回复数通过一次 JOIN 取回，不加载 ORM 对象"""
+    reply_count, counter, onclause = counter_column(COMMENT_REPLIES, DBComment.id, "reply_count")
+    return (
+        select(
+            DBComment.id,
+            DBComment.article_id,
+            DBComment.user_id,
+            DBUser.username.label("username"),
+            DBComment.content,
+            DBComment.parent_id,
+            DBComment.created_at,
+            reply_count,
+        )
+        .outerjoin(DBUser, DBUser.id == DBComment.user_id)
+        .outerjoin(counter, onclause)
+    )
+
+
+def comment_dict(row) -> dict:
+    return {
+        "id": row["id"],
+        "article_id": row["article_id"],
+        "user_id": row["user_id"],
+        "username": row["username"],
+        "content": row["content"],
+        "parent_id": row["parent_id"],
+        "created_at": row["created_at"],
+        "reply_count": row["reply_count"],
+    }
+
+
+def subtree_query(root_ids, max_depth: Optional[int] = None):
+    """递归 CTE：给定根评论，取出整棵回复子树（含根）的 id、parent_id 与深度"""
+    subtree = (
+        select(DBComment.id, DBComment.parent_id, literal(0).label("depth"))
+        .where(DBComment.id.in_(root_ids))
+        .cte(name="comment_subtree", recursive=True)
+    )
+    children = (
+        select(DBComment.id, DBComment.parent_id, (subtree.c.depth + 1).label("depth"))
+        .join(subtree, DBComment.parent_id == subtree.c.id)
+    )
+    if max_depth is not None:
+        children = children.where(subtree.c.depth < max_depth)
+    return subtree.union_all(children)
+
+
+async def limited_subtree(db: AsyncSession, root_ids: List[int], max_depth: int, max_children: int) -> Dict[int, int]:
+    """逐层取子评论，每个父评论只取前 max_children + 1 条（多取的一条用于判断是否还有更多）。
+
+    递归 CTE 的递归部分不能使用窗口函数，因此按层查询，查询次数为 max_depth + 1，
+    每层都走 (parent_id, created_at, id) 索引，回复再多也只读取需要展示的部分。
+    返回 {comment_id: depth}。
+    """
+    depths = {root_id: 0 for root_id in root_ids}
+    frontier = list(root_ids)
+    for depth in range(1, max_depth + 2):
+        if not frontier:
+            break
+        rank = func.row_number().over(
+            partition_by=DBComment.parent_id, order_by=(DBComment.created_at, DBComment.id)
+        ).label("sibling_rank")
+        ranked = select(DBComment.id, rank).where(DBComment.parent_id.in_(frontier)).subquery()
+        result = await db.execute(
+            select(ranked.c.id, ranked.c.sibling_rank).where(ranked.c.sibling_rank <= max_children + 1)
+        )
+        frontier = []
+        for comment_id, position in result.all():
+            depths[comment_id] = depth
+            # 多取的那一条只用于判断，不再展开
+            if position <= max_children:
+                frontier.append(comment_id)
+    return depths
+
+
+def build_tree(rows, root_ids: List[int], max_depth: int, max_children: int) -> List[dict]:
+    """一次遍历组装回复树；rows 需按 (created_at, id) 排序，深度为 max_depth + 1 的行只用于判断是否还有更多回复"""
+    nodes: Dict[int, dict] = {}
+    depths: Dict[int, int] = {}
+    children = defaultdict(list)
+    roots = set(root_ids)
+    for row in rows:
+        depths[row["id"]] = row["depth"]
+        if row["depth"] <= max_depth:
+            nodes[row["id"]] = comment_dict(row)
+        if row["id"] not in roots:
+            children[row["parent_id"]].append(row)
+
+    for node_id, node in nodes.items():
+        replies = children.get(node_id, [])
+        shown = replies[:max_children] if depths[node_id] < max_depth else []
+        node["replies"] = [nodes[reply["id"]] for reply in shown]
+        node["has_more_replies"] = len(replies) > len(shown)
+        node["replies_cursor"] = (
+            encode_cursor(shown[-1]["created_at"], shown[-1]["id"]) if node["has_more_replies"] and shown else None
+        )
+    return [nodes[root_id] for root_id in root_ids]
+
+
+async def load_threads(db: AsyncSession, roots_query, cursor: Optional[str], limit: int,
+                       max_depth: int = DEFAULT_MAX_DEPTH, max_children: int = DEFAULT_MAX_CHILDREN):
+    """键集分页取一页根评论，再逐层取回受限的子树并组装为嵌套结构"""
+    result = await db.execute(
+        apply_keyset(roots_query, DBComment.created_at, DBComment.id, cursor, limit, descending=False)
+    )
+    roots, next_cursor = split_page(result.mappings().all(), limit)
+    root_ids = [row["id"] for row in roots]
+    if not root_ids:
+        return [], next_cursor
+
+    depths = await limited_subtree(db, root_ids, max_depth, max_children)
+    result = await db.execute(
+        comment_query()
+        .where(DBComment.id.in_(list(depths)))
+        .order_by(DBComment.created_at, DBComment.id)
+    )
+    rows = [{**row, "depth": depths[row["id"]]} for row in result.mappings().all()]
+    return build_tree(rows, root_ids, max_depth, max_children), next_cursor
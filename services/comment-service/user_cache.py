@@ -0,0 +1,78 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import User as DBUser
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+# 不存在的用户也缓存，时间较短；用户注册时由 user-service 通知失效
+USER_CACHE_NEGATIVE_TTL = float(os.getenv("USER_CACHE_NEGATIVE_TTL", "30"))
+
+_MISSING = object()
+
+
+class UserCache:
+    """进程内用户 id -> 用户名缓存；值为 None 表示用户不存在"""
+
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL,
+                 negative_ttl: float = USER_CACHE_NEGATIVE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[int, Tuple[float, Optional[str]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, user_id: int):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return _MISSING
+        expires_at, username = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return _MISSING
+        self._entries.move_to_end(user_id)
+        return username
+
+    def _store(self, user_id: int, username: Optional[str]):
+        ttl = self.ttl if username is not None else self.negative_ttl
+        self._entries[user_id] = (time.monotonic() + ttl, username)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get(self, db: AsyncSession, user_id: int) -> Optional[str]:
+        return (await self.get_many(db, [user_id]))[int(user_id)]
+
+    async def get_many(self, db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, Optional[str]]:
+        """批量获取用户名，未命中的 id 一次 IN 查询补齐"""
+        found = {}
+        missing = []
+        for user_id in dict.fromkeys(int(user_id) for user_id in user_ids):
+            username = self._lookup(user_id)
+            if username is _MISSING:
+                missing.append(user_id)
+            else:
+                found[user_id] = username
+        self.hits += len(found)
+        self.misses += len(missing)
+        if missing:
+            result = await db.execute(select(DBUser.id, DBUser.username).where(DBUser.id.in_(missing)))
+            loaded = dict(result.all())
+            for user_id in missing:
+                found[user_id] = loaded.get(user_id)
+                self._store(user_id, found[user_id])
+        return found
+
+    def invalidate(self, user_ids: Iterable[int]):
+        for user_id in user_ids:
+            self._entries.pop(int(user_id), None)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = UserCache()
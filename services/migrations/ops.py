@@ -0,0 +1,94 @@
+"""迁移脚本使用的幂等 DDL 操作，重复执行或在部分完成的库上执行都不会出错"""
+import logging
+from typing import List
+from sqlalchemy import Column, Index, MetaData, Table, inspect, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger("migrations")
+
+
+class MissingTable(Exception):
+    """迁移要修改的表不存在；抛出后该版本不会被记录为已执行"""
+
+
+async def table_exists(conn: AsyncConnection, table: str) -> bool:
+    return await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table(table))
+
+
+async def index_exists(conn: AsyncConnection, table: str, name: str) -> bool:
+    def check(sync_conn):
+        return any(index["name"] == name for index in inspect(sync_conn).get_indexes(table))
+    return await conn.run_sync(check)
+
+
+async def require_table(conn: AsyncConnection, table: str):
+    if not await table_exists(conn, table):
+        raise MissingTable(f"table {table} does not exist")
+
+
+async def create_missing_tables(conn: AsyncConnection, metadata: MetaData):
+    missing = [table.name for table in metadata.sorted_tables if not await table_exists(conn, table.name)]
+    await conn.run_sync(metadata.create_all)
+    if missing:
+        logger.info(f"Created tables: {', '.join(missing)}")
+
+
+async def create_index(conn: AsyncConnection, name: str, table: str, columns: List[str]):
+    await require_table(conn, table)
+    if await index_exists(conn, table, name):
+        logger.info(f"Skip index {name}: already exists")
+        return
+
+    def create(sync_conn):
+        reflected = Table(table, MetaData(), autoload_with=sync_conn)
+        Index(name, *[reflected.c[column] for column in columns]).create(sync_conn)
+
+    await conn.run_sync(create)
+    logger.info(f"Created index {name} on {table}({', '.join(columns)})")
+
+
+async def require_timestamp(conn: AsyncConnection, table: str, column: str):
+    """把可空的 DATETIME 列回填为当前时间并改为 NOT NULL DEFAULT CURRENT_TIMESTAMP。
+
+    SQLite 不支持修改列定义，只做回填。
+    """
+    await require_table(conn, table)
+    result = await conn.execute(text(f"UPDATE {table} SET {column} = CURRENT_TIMESTAMP WHERE {column} IS NULL"))
+    if result.rowcount:
+        logger.info(f"Backfilled {result.rowcount} NULL {table}.{column} values")
+    if conn.dialect.name == "mysql":
+        await conn.execute(text(f"ALTER TABLE {table} MODIFY {column} DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP"))
+        logger.info(f"Made {table}.{column} NOT NULL")
+
+
+async def add_column(conn: AsyncConnection, table: str, column: Column):
+    """只支持可空列；外键约束由 require_foreign_key 单独补上"""
+    await require_table(conn, table)
+    columns = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_columns(table))
+    if any(existing["name"] == column.name for existing in columns):
+        return
+    column_type = column.type.compile(dialect=conn.dialect)
+    await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column.name} {column_type} NULL"))
+    logger.info(f"Added column {table}.{column.name}")
+
+
+async def require_foreign_key(conn: AsyncConnection, table: str, column: str, referred: str, ondelete: str):
+    """确保 table.column 上有指向 referred(id) 且 ON DELETE 一致的外键。
+
+    SQLite 不支持修改约束，跳过。
+    """
+    await require_table(conn, table)
+    if conn.dialect.name != "mysql":
+        logger.info(f"Skip foreign key {table}.{column}: not supported on {conn.dialect.name}")
+        return
+    foreign_keys = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_foreign_keys(table))
+    for fk in foreign_keys:
+        if fk["constrained_columns"] != [column]:
+            continue
+        if (fk.get("options", {}).get("ondelete") or "").upper() == ondelete:
+            return
+        await conn.execute(text(f"ALTER TABLE {table} DROP FOREIGN KEY {fk['name']}"))
+    await conn.execute(text(
+        f"ALTER TABLE {table} ADD FOREIGN KEY ({column}) REFERENCES {referred}(id) ON DELETE {ondelete}"
+    ))
+    logger.info(f"Made {table}.{column} reference {referred}(id) ON DELETE {ondelete}")
@@ -0,0 +1,117 @@
+"""完整的库表结构，由 0000 号迁移在新库上建表。
+
+各服务 database/models.py 中的同名表必须与这里保持一致；表结构变更先写迁移，再同步这里与各服务的模型。
+"""
+from sqlalchemy import (
+    Column, DateTime, ForeignKey, Index, Integer, LargeBinary, MetaData, String, Table, Text, UniqueConstraint, func,
+)
+
+metadata = MetaData()
+
+users = Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String(50), unique=True, nullable=False),
+    Column("password_hash", Text, nullable=False),
+    Column("email", String(100), unique=True, nullable=False),
+    Column("created_at", DateTime),
+)
+
+articles = Table(
+    "articles",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String(255), nullable=False),
+    Column("content", Text, nullable=False),
+    Column("author_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("created_at", DateTime, nullable=False, server_default=func.current_timestamp()),
+    Index("ix_articles_created_at_id", "created_at", "id"),
+    Index("ix_articles_author_id_created_at", "author_id", "created_at"),
+)
+
+comments = Table(
+    "comments",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("article_id", Integer, ForeignKey("articles.id", ondelete="CASCADE"), nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("content", Text, nullable=False),
+    Column("parent_id", Integer, ForeignKey("comments.id", ondelete="CASCADE"), nullable=True),
+    Column("created_at", DateTime, nullable=False, server_default=func.current_timestamp()),
+    Index("ix_comments_article_id_created_at", "article_id", "created_at", "id"),
+    Index("ix_comments_article_id_parent_id_created_at", "article_id", "parent_id", "created_at", "id"),
+    Index("ix_comments_parent_id_created_at", "parent_id", "created_at", "id"),
+)
+
+tags = Table(
+    "tags",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(50), unique=True, nullable=False),
+)
+
+article_tags = Table(
+    "article_tags",
+    metadata,
+    Column("article_id", Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_article_tags_tag_id_article_id", "tag_id", "article_id"),
+)
+
+counters = Table(
+    "counters",
+    metadata,
+    Column("scope", String(32), primary_key=True),
+    Column("ref_id", Integer, primary_key=True),
+    Column("value", Integer, nullable=False),
+)
+
+summary_cache = Table(
+    "summary_cache",
+    metadata,
+    Column("key", String(64), primary_key=True),
+    Column("model", String(64), nullable=False),
+    Column("prompt_version", String(16), nullable=False),
+    Column("result", Text, nullable=False),
+    Column("created_at", DateTime),
+)
+
+article_summaries = Table(
+    "article_summaries",
+    metadata,
+    Column("article_id", Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True),
+    Column("content_hash", String(64), nullable=False),
+    Column("summary", Text, nullable=True),
+    Column("sentiment", String(32), nullable=True),
+    Column("keywords", Text, nullable=True),
+    Column("model", String(64), nullable=False),
+    Column("prompt_version", String(16), nullable=False),
+    Column("updated_at", DateTime),
+)
+
+article_embeddings = Table(
+    "article_embeddings",
+    metadata,
+    Column("article_id", Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True),
+    Column("content_hash", String(64), nullable=False),
+    Column("model", String(64), nullable=False),
+    Column("dim", Integer, nullable=False),
+    Column("vector", LargeBinary, nullable=False),
+    Column("updated_at", DateTime, index=True),
+)
+
+ai_jobs = Table(
+    "ai_jobs",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("kind", String(32), nullable=False),
+    Column("ref_id", Integer, nullable=False),
+    Column("status", String(16), nullable=False, index=True),
+    Column("version", Integer, nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("run_at", DateTime, nullable=False),
+    Column("locked_at", DateTime, nullable=True),
+    Column("last_error", Text, nullable=True),
+    UniqueConstraint("kind", "ref_id", name="uq_ai_jobs_kind_ref"),
+)
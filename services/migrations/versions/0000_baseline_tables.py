@@ -0,0 +1,11 @@
+"""新库的表由迁移按 schema.py 创建，不依赖各服务启动时的 create_all；已有的表只补缺失的列"""
+from ops import add_column, create_missing_tables
+from schema import comments, metadata
+
+DESCRIPTION = "create missing tables and columns"
+
+
+async def upgrade(conn):
+    await create_missing_tables(conn, metadata)
+    # user-service 曾按缺少 parent_id 的模型建过 comments 表
+    await add_column(conn, "comments", comments.c.parent_id)
@@ -0,0 +1,22 @@
+"""为热点查询补充复合索引，与各服务 models.py 中声明的索引同名"""
+from ops import create_index
+
+DESCRIPTION = "composite indexes for article/comment list queries"
+
+INDEXES = [
+    # 文章列表按 (created_at, id) 键集分页
+    ("ix_articles_created_at_id", "articles", ["created_at", "id"]),
+    # 按作者查文章，删除用户时的级联删除
+    ("ix_articles_author_id_created_at", "articles", ["author_id", "created_at"]),
+    # 平铺评论 / 树形模式顶层评论 / 回复与递归子树
+    ("ix_comments_article_id_created_at", "comments", ["article_id", "created_at", "id"]),
+    ("ix_comments_article_id_parent_id_created_at", "comments", ["article_id", "parent_id", "created_at", "id"]),
+    ("ix_comments_parent_id_created_at", "comments", ["parent_id", "created_at", "id"]),
+    # 按标签查文章，主键 (article_id, tag_id) 用不上
+    ("ix_article_tags_tag_id_article_id", "article_tags", ["tag_id", "article_id"]),
+]
+
+
+async def upgrade(conn):
+    for name, table, columns in INDEXES:
+        await create_index(conn, name, table, columns)
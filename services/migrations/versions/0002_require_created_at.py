@@ -0,0 +1,9 @@
+"""created_at 是键集分页的排序键，为 NULL 时无法生成游标"""
+from ops import require_timestamp
+
+DESCRIPTION = "make articles/comments created_at NOT NULL"
+
+
+async def upgrade(conn):
+    for table in ("articles", "comments"):
+        await require_timestamp(conn, table, "created_at")
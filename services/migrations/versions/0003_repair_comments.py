@@ -0,0 +1,23 @@
+"""0001/0002 曾在表不存在时跳过操作仍记为已执行，这里重新执行一遍，并统一 comments 的外键"""
+import importlib
+from ops import create_index, require_foreign_key, require_timestamp
+
+INDEXES = importlib.import_module("versions.0001_hot_path_indexes").INDEXES
+
+DESCRIPTION = "re-apply skipped indexes/timestamps, cascade comment foreign keys"
+
+FOREIGN_KEYS = [
+    # 删除文章、用户、父评论时由数据库级联删除评论
+    ("comments", "article_id", "articles"),
+    ("comments", "user_id", "users"),
+    ("comments", "parent_id", "comments"),
+]
+
+
+async def upgrade(conn):
+    for name, table, columns in INDEXES:
+        await create_index(conn, name, table, columns)
+    for table in ("articles", "comments"):
+        await require_timestamp(conn, table, "created_at")
+    for table, column, referred in FOREIGN_KEYS:
+        await require_foreign_key(conn, table, column, referred, "CASCADE")
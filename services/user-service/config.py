@@ -1 +1,4 @@
-SECRET_KEY = "a_random_secure_key_12345$%&*!"
\ No newline at end of file
+import os
+
+# 与网关的 JWT_SECRET 保持一致
+SECRET_KEY = os.getenv("JWT_SECRET", "a_random_secure_key_12345$%&*!")
@@ -1,10 +1,11 @@
 from fastapi import FastAPI, Depends, HTTPException, APIRouter
 from pydantic import BaseModel
-from passlib.context import CryptContext
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from auth import create_access_token
-from database.database import get_db, init_db
+from passwords import password_hasher
+import notify
+from database.database import get_db, init_db, pool_stats
 from database.models import User 
 import httpx
 import socket
@@ -18,8 +19,6 @@ SERVICE_PORT = 8001
 CONSUL_HOST = "consul"
 CONSUL_PORT = 8500
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 class UserCreate(BaseModel):
     username: str
     password: str
@@ -57,11 +56,27 @@ async def startup_event():
             print(f"Failed to register with Consul: {e}")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    password_hasher.close()
+    await notify.close()
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 
+@app.get("/db/pool")
+async def db_pool():
+    return pool_stats()
+
+
+@app.get("/passwords/stats")
+async def passwords_stats():
+    return password_hasher.stats()
+
+
 @router.post("/register/")
 async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     # 检查用户名是否已存在
@@ -70,11 +85,13 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Username already exists")
 
     # 创建新用户
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = await password_hasher.hash(user.password)
     new_user = User(username=user.username, password_hash=hashed_password, email=user.email)
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)
+    # 其他服务可能缓存了"用户不存在"
+    notify.users_changed([new_user.id])
 
     return {"username": new_user.username, "user_id": str(new_user.id)}
 
@@ -84,9 +101,17 @@ async def login(user: UserLogin, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.username == user.username))
     db_user = result.scalars().first()
 
-    # 检查用户是否存在以及密码是否正确
-    if not db_user or not pwd_context.verify(user.password, db_user.password_hash):
+    # 检查用户是否存在以及密码是否正确（bcrypt 在线程池中执行）
+    if not db_user:
         raise HTTPException(status_code=401, detail="Invalid username or password")
+    valid, new_hash = await password_hasher.verify_and_update(user.password, db_user.password_hash)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+
+    # 成本因子变更后按新配置重新哈希
+    if new_hash:
+        db_user.password_hash = new_hash
+        await db.commit()
 
     # 生成 JWT Token
     token = create_access_token(user_id=str(db_user.id))
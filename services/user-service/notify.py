@@ -0,0 +1,39 @@
+import os
+import asyncio
+import logging
+from typing import List
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 持有用户缓存的服务，用户变更后通知它们失效
+USER_CACHE_SUBSCRIBERS = [
+    url for url in os.getenv(
+        "USER_CACHE_SUBSCRIBERS", "http://article_service:8002,http://comment_service:8003"
+    ).split(",") if url
+]
+
+_client = httpx.AsyncClient(timeout=2.0)
+_pending = set()
+
+
+async def _notify(user_ids: List[int]):
+    async def post(base_url):
+        try:
+            await _client.post(f"{base_url}/internal/users/invalidate", json={"user_ids": user_ids})
+        except Exception as e:
+            # 通知失败时对方的负缓存会在短 TTL 后自然过期
+            logger.warning(f"Failed to invalidate user cache at {base_url}: {e}")
+
+    await asyncio.gather(*(post(url) for url in USER_CACHE_SUBSCRIBERS))
+
+
+def users_changed(user_ids: List[int]):
+    """后台发送失效通知，不阻塞当前请求"""
+    task = asyncio.create_task(_notify(user_ids))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def close():
+    await _client.aclose()
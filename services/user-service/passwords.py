@@ -0,0 +1,59 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+
+# bcrypt 成本因子；修改后旧哈希会在用户下次登录时按新成本重算
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt 计算时释放 GIL，线程池即可利用多核
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+
+# min/max 与默认值一致，成本不同的哈希都会被 needs_update 标记
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+class PasswordHasher:
+    """在专用线程池中执行 bcrypt，不阻塞事件循环；超出并发上限的请求在协程中排队"""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._semaphore = asyncio.Semaphore(workers)
+        self.waiting = 0
+
+    async def _run(self, func, *args):
+        self.waiting += 1
+        acquired = False
+        try:
+            await self._semaphore.acquire()
+            acquired = True
+            self.waiting -= 1
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            if acquired:
+                self._semaphore.release()
+            else:
+                self.waiting -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        """返回 (是否匹配, 需要替换的新哈希或 None)"""
+        return await self._run(pwd_context.verify_and_update, password, password_hash)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "rounds": BCRYPT_ROUNDS, "waiting": self.waiting}
+
+
+password_hasher = PasswordHasher()